@@ -1,20 +1,215 @@
 # core/database/mongodb_handler.py
-from pymongo import MongoClient
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
 from core.config import Config
+from .write_behind import WriteBehindQueue
+from .vector_index import VectorIndex
 
 class MongoDBHandler:
-    def __init__(self):
-        self.client = MongoClient(Config.MONGODB_URI)
-        self.db = self.client['ai_database']
-        
-    def store_conversation(self, data):
-        return self.db.conversations.insert_one(data)
-        
-    def store_learning(self, data):
-        return self.db.learned_data.insert_one(data)
+    def __init__(self, database=None, max_queue=10000, batch_size=100, flush_interval=0.5,
+                 embed=None, index_nlist=0, index_max_size=50000, index_refresh_interval=10,
+                 index_overlap=60, index_path=None, index_snapshot_interval=300):
+        # Pass an InMemoryDatabase (or any Motor-like database) to run without mongod
+        self.client = None
+        if database is None:
+            # connect=False defers background threads to first use (after any fork)
+            self.client = AsyncIOMotorClient(Config.MONGODB_URI, connect=False)
+            database = self.client['ai_database']
+        self.db = database
+
+        # Writes are buffered and flushed with insert_many in the background
+        writer_options = {
+            'max_queue': max_queue,
+            'batch_size': batch_size,
+            'flush_interval': flush_interval
+        }
+        self.conversation_writer = WriteBehindQueue(self.db.conversations, **writer_options)
+        self.learning_writer = WriteBehindQueue(self.db.learned_data, **writer_options)
+
+        # In-process retrieval index over stored conversations (needs an embedding function).
+        # The conversations collection is the source of truth: every worker resumes
+        # from the snapshot at index_path (or back-fills from scratch without one),
+        # then polls for new conversations, including those stored by other workers.
+        # Queries use $text until the index is loaded or back-filled.
+        self.embed = embed
+        self.index = VectorIndex(nlist=index_nlist, max_size=index_max_size) if embed is not None else None
+        self.index_max_size = index_max_size
+        self.index_ready = False
+        self.index_refresh_interval = index_refresh_interval
+        # Re-read this far behind the newest indexed conversation, to catch
+        # late (write-behind) inserts and clock skew between workers
+        self.index_overlap = timedelta(seconds=index_overlap)
+        self._index_since = None
+        # Oldest conversation kept by a capped back-fill; older ones stay out
+        self._index_floor = None
+        # str(_id) -> timestamp of indexed conversations inside the overlap window
+        self._indexed_ids = {}
+        self._index_refresher = None
+        # Snapshots are atomic, so workers sharing index_path can all write it
+        self.index_path = index_path
+        self.index_snapshot_interval = index_snapshot_interval
+        self._index_saved_at = None
+        self._index_dirty = False
+
+    async def store_conversation(self, data):
+        # Indexed by the next refresh once it has been written
+        await self.conversation_writer.put(data)
+
+    async def store_learning(self, data):
+        await self.learning_writer.put(data)
         
-    def get_relevant_context(self, query):
-        return self.db.conversations.find(
+    async def get_relevant_context(self, query, limit=5):
+        if self.index is not None and self.index_ready:
+            vector = await asyncio.to_thread(self.embed, query)
+            return self.index.search(vector, k=limit)
+
+        cursor = self.db.conversations.find(
             {"$text": {"$search": query}},
             {"score": {"$meta": "textScore"}}
-        ).sort([("score", {"$meta": "textScore"})]).limit(5)
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def refresh_index(self):
+        """
+        Index conversations stored since the last refresh. The first call
+        back-fills the most recent index_max_size conversations.
+        """
+        projection = {'user_input': 1, 'response.response': 1, 'timestamp': 1}
+        if self._index_since is None:
+            cursor = self.db.conversations.find({}, projection).sort('timestamp', -1).limit(self.index_max_size)
+            documents = (await cursor.to_list(length=self.index_max_size))[::-1]
+            if self.index_max_size and len(documents) >= self.index_max_size:
+                self._index_floor = documents[0].get('timestamp')
+        else:
+            cursor = self.db.conversations.find(
+                {'timestamp': {'$gte': self._index_since - self.index_overlap}},
+                projection
+            ).sort('timestamp', 1)
+            documents = await cursor.to_list(length=None)
+
+        documents = [
+            document for document in documents
+            if document.get('user_input') and str(document.get('_id')) not in self._indexed_ids
+            and not (self._index_floor is not None and document.get('timestamp') is not None
+                     and document['timestamp'] < self._index_floor)
+        ]
+        if documents:
+            vectors = await asyncio.to_thread(
+                lambda: [self.embed(document['user_input']) for document in documents]
+            )
+            for document, vector in zip(documents, vectors):
+                response = document.get('response')
+                self.index.add(vector, {
+                    'user_input': document['user_input'],
+                    'response': response.get('response') if isinstance(response, dict) else response,
+                    'timestamp': str(document.get('timestamp'))
+                })
+                timestamp = document.get('timestamp')
+                self._indexed_ids[str(document.get('_id'))] = timestamp
+                if timestamp is not None and (self._index_since is None or timestamp > self._index_since):
+                    self._index_since = timestamp
+
+        if self._index_since is not None:
+            cutoff = self._index_since - self.index_overlap
+            self._indexed_ids = {
+                doc_id: timestamp for doc_id, timestamp in self._indexed_ids.items()
+                if timestamp is None or timestamp >= cutoff
+            }
+        self.index_ready = True
+        self._index_dirty = self._index_dirty or bool(documents)
+        return len(documents)
+
+    async def load_index(self):
+        """
+        Resume from the snapshot at index_path: the index and the refresh
+        position, so the next refresh only reads newer conversations.
+        Returns False when there is no usable snapshot.
+        """
+        if not self.index_path or not os.path.exists(self.index_path):
+            return False
+        try:
+            index = await asyncio.to_thread(VectorIndex.load, self.index_path)
+            state = index.state
+            if not state.get('since') or (index.max_size or 0) != (self.index_max_size or 0):
+                return False
+            since = datetime.fromisoformat(state['since'])
+            floor = datetime.fromisoformat(state['floor']) if state.get('floor') else None
+            indexed_ids = {
+                doc_id: datetime.fromisoformat(timestamp) if timestamp else None
+                for doc_id, timestamp in state.get('indexed_ids', {}).items()
+            }
+        except Exception as e:
+            print(f"Vector index load error: {str(e)}")
+            return False
+
+        self.index = index
+        self._index_since, self._index_floor, self._indexed_ids = since, floor, indexed_ids
+        self._index_saved_at = time.monotonic()
+        self.index_ready = True
+        return True
+
+    async def save_index(self):
+        """Snapshot the index and refresh position to index_path"""
+        if not self.index_path or self.index is None or self._index_since is None:
+            return
+        self.index.state = {
+            'since': self._index_since.isoformat(),
+            'floor': self._index_floor.isoformat() if self._index_floor is not None else None,
+            'indexed_ids': {
+                doc_id: timestamp.isoformat() if timestamp is not None else None
+                for doc_id, timestamp in self._indexed_ids.items()
+            }
+        }
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Only the refresh loop (or close(), after cancelling it) changes the
+        # index, so it is not modified while the snapshot is written
+        await asyncio.to_thread(self.index.save, self.index_path)
+        self._index_saved_at = time.monotonic()
+        self._index_dirty = False
+
+    async def _index_refresh_loop(self):
+        await self.load_index()
+        while True:
+            try:
+                await self.refresh_index()
+                if self._index_dirty and (
+                        self._index_saved_at is None
+                        or time.monotonic() - self._index_saved_at >= self.index_snapshot_interval):
+                    await self.save_index()
+            except Exception as e:
+                print(f"Vector index refresh error: {str(e)}")
+            await asyncio.sleep(self.index_refresh_interval)
+
+    def start_index_refresh(self):
+        """Load or back-fill the retrieval index, then keep it up to date in the background"""
+        if self.index is not None and (self._index_refresher is None or self._index_refresher.done()):
+            self._index_refresher = asyncio.get_running_loop().create_task(self._index_refresh_loop())
+
+    async def close(self):
+        """Flush pending writes and close the client"""
+        if self._index_refresher is not None:
+            self._index_refresher.cancel()
+            self._index_refresher = None
+            if self._index_dirty:
+                try:
+                    await self.save_index()
+                except Exception as e:
+                    print(f"Vector index save error: {str(e)}")
+        await self.conversation_writer.drain()
+        await self.learning_writer.drain()
+        if self.client is not None:
+            self.client.close()
+
+    def get_stats(self):
+        return {
+            'conversations': self.conversation_writer.get_stats(),
+            'learned_data': self.learning_writer.get_stats(),
+            'index_size': len(self.index) if self.index is not None else 0,
+            'index_ready': self.index_ready,
+            'index_dropped': dict(self.index.dropped) if self.index is not None else {}
+        }
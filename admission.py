@@ -0,0 +1,163 @@
+# app/middleware/admission.py
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import Request, HTTPException
+from core.monitoring import metrics
+
+class AdmissionRejected(Exception):
+    """A request was refused; retry_after is a hint in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst):
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, rate, burst):
+        """Spend one token; returns 0, or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate
+
+class AdmissionController:
+    """
+    Admission in front of the expensive endpoints:
+    - optionally, a token bucket per subject (verified JWT 'sub', else
+      client address); off unless rate is set, since clients behind one
+      proxy or NAT would otherwise share a single bucket
+    - at most max_concurrent requests running; up to max_queue more wait
+      for a slot, at most queue_timeout seconds. Beyond that requests are
+      shed immediately with 429 rather than queued into upstream timeouts.
+    """
+
+    def __init__(self, auth=None, rate=None, burst=10, max_concurrent=32, max_queue=64,
+                 queue_timeout=5.0, max_subjects=10000, trusted_proxies=()):
+        self.auth = auth
+        # Peers whose X-Forwarded-For is believed when naming anonymous clients
+        self.trusted_proxies = frozenset(trusted_proxies)
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_subjects = max_subjects
+        self._buckets = OrderedDict()
+        self._slots = None
+        self.active = 0
+        self.waiting = 0
+        self.stats = {'admitted': 0, 'rate_limited': 0, 'shed': 0, 'queue_timeout': 0}
+
+    async def identify(self, authorization, fallback):
+        """Subject for rate limiting; raises HTTPException(401) on a bad token"""
+        if authorization and self.auth is not None:
+            scheme, _, token = authorization.partition(' ')
+            if scheme.lower() == 'bearer' and token:
+                payload = await self.auth.verify_token(token)
+                if not payload.get('sub'):
+                    raise HTTPException(status_code=401, detail="Token has no subject")
+                return f"user:{payload['sub']}"
+        return f"anon:{fallback}"
+
+    def client_address(self, peer, forwarded_for=None):
+        """
+        Address of the client for anonymous subjects. X-Forwarded-For is
+        only used when the peer is a trusted proxy, and then only up to the
+        first hop that is not itself a trusted proxy.
+        """
+        if peer is None:
+            return 'unknown'
+        if peer not in self.trusted_proxies or not forwarded_for:
+            return peer
+        for hop in reversed([hop.strip() for hop in forwarded_for.split(',')]):
+            if hop and hop not in self.trusted_proxies:
+                return hop
+        return peer
+
+    def check_rate(self, subject):
+        if self.rate is None:
+            return
+        bucket = self._buckets.get(subject)
+        if bucket is None:
+            bucket = self._buckets[subject] = TokenBucket(self.burst)
+            if len(self._buckets) > self.max_subjects:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(subject)
+        wait = bucket.take(self.rate, self.burst)
+        if wait:
+            self._reject('rate_limited')
+            raise AdmissionRejected('rate_limited', wait)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the max_concurrent slots for the duration of the block"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self._reject('shed')
+            raise AdmissionRejected('overloaded', 1.0)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject('queue_timeout')
+            raise AdmissionRejected('overloaded', 1.0)
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.stats['admitted'] += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    @asynccontextmanager
+    async def admit(self, subject):
+        """Rate check for subject, then a concurrency slot"""
+        self.check_rate(subject)
+        async with self.slot():
+            yield
+
+    def http_dependency(self):
+        """FastAPI dependency that admits the request (or answers 429) and yields its subject"""
+        async def admit_request(request: Request):
+            subject = await self.identify(
+                request.headers.get('authorization'),
+                self.client_address(
+                    request.client.host if request.client else None,
+                    request.headers.get('x-forwarded-for')
+                )
+            )
+            try:
+                async with self.admit(subject):
+                    yield subject
+            except AdmissionRejected as e:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Request rejected: {e.reason}",
+                    headers={'Retry-After': str(math.ceil(e.retry_after))}
+                )
+        return admit_request
+
+    def _reject(self, reason):
+        self.stats[reason] += 1
+        metrics.ADMISSION_REJECTED.inc(reason=reason)
+
+    def get_stats(self):
+        return {**self.stats, 'active': self.active, 'waiting': self.waiting}
@@ -5,11 +5,20 @@ class API {
         this.ws = null;
         this.messageQueue = [];
         this.isConnected = false;
+        this.streams = {}; // message_id -> partially assembled response
+        this.pending = {}; // request_id -> message text, until its final frame arrives
     }
 
     async connect() {
         try {
-            this.ws = new WebSocket(this.config.wsUrl);
+            // msgpack frames need a MessagePack decoder (e.g. @msgpack/msgpack) on the page
+            const useMsgpack = this.config.format === 'msgpack' && typeof MessagePack !== 'undefined';
+            const url = useMsgpack ? `${this.config.wsUrl}?format=msgpack` : this.config.wsUrl;
+            // Browsers cannot set an Authorization header here; the server reads the subprotocol pair
+            this.ws = this.config.authToken
+                ? new WebSocket(url, ['bearer', this.config.authToken])
+                : new WebSocket(url);
+            this.ws.binaryType = 'arraybuffer';
             
             this.ws.onopen = () => {
                 this.isConnected = true;
@@ -17,7 +26,9 @@ class API {
             };
 
             this.ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
+                const data = event.data instanceof ArrayBuffer
+                    ? MessagePack.decode(new Uint8Array(event.data))
+                    : JSON.parse(event.data);
                 this.handleResponse(data);
             };
 
@@ -38,10 +49,18 @@ class API {
                 return;
             }
 
+            const requestId = this.createMessageId();
+            this.pending[requestId] = message;
             const data = {
                 message: message,
+                request_id: requestId,
+                message_id: requestId,
+                stream: Boolean(this.config.stream),
                 timestamp: new Date().toISOString()
             };
+            if (this.config.fields) {
+                data.options = { fields: this.config.fields };
+            }
 
             this.ws.send(JSON.stringify(data));
 
@@ -58,18 +77,87 @@ class API {
         }
     }
 
+    createMessageId() {
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    }
+
     handleResponse(data) {
+        if (data.type === 'overloaded') {
+            // The server refused the message; send it again once it suggests
+            const message = this.pending[data.request_id];
+            delete this.pending[data.request_id];
+            if (message !== undefined) {
+                setTimeout(() => this.sendMessage(message), Math.max(1, data.retry_after || 1) * 1000);
+            }
+            return;
+        }
+        if (data.message_id && data.type) {
+            this.handleStreamFrame(data);
+            return;
+        }
+
+        delete this.pending[data.request_id];
+
         // Dispatch custom event with response
         const event = new CustomEvent('ai-response', { detail: data });
         document.dispatchEvent(event);
     }
 
+    handleStreamFrame(frame) {
+        // Reassemble streamed frames by message id
+        let stream = this.streams[frame.message_id];
+        if (!stream) {
+            stream = this.streams[frame.message_id] = {
+                text: '',
+                enhancements: null,
+                nlpAnalysis: null
+            };
+        }
+
+        switch (frame.type) {
+            case 'token':
+                stream.text += frame.delta;
+                document.dispatchEvent(new CustomEvent('ai-stream', {
+                    detail: { messageId: frame.message_id, delta: frame.delta, text: stream.text }
+                }));
+                break;
+            case 'nlp_analysis':
+                stream.nlpAnalysis = frame.nlp_analysis;
+                break;
+            case 'enhancements':
+                stream.enhancements = frame.enhancements;
+                break;
+            case 'done':
+            case 'error':
+                delete this.streams[frame.message_id];
+                this.handleResponse(frame.type === 'error' ? {
+                    status: 'error',
+                    message: frame.message,
+                    request_id: frame.request_id,
+                    message_id: frame.message_id
+                } : {
+                    status: frame.status,
+                    request_id: frame.request_id,
+                    message_id: frame.message_id,
+                    response: {
+                        main_response: { response: stream.text },
+                        enhancements: stream.enhancements,
+                        stages: frame.stages
+                    },
+                    nlp_analysis: stream.nlpAnalysis,
+                    context: frame.context
+                });
+                break;
+        }
+    }
+
     async fallbackHttpRequest(message) {
         try {
             const response = await fetch(`${this.config.apiUrl}/process`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    ...(this.config.authToken ? { 'Authorization': `Bearer ${this.config.authToken}` } : {}),
                 },
                 body: JSON.stringify({ text: message })
             });
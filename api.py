@@ -1,38 +1,86 @@
 # app/routes/api.py
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response
 from typing import Optional
 from pydantic import BaseModel
+import asyncio
+import uuid
+
+from app.main import api_orchestrator, language_processor, context_store, admission
+from core.utils.projection import analysis_tasks, project
+from core.utils.serialization import dumps_json
 
 router = APIRouter()
 
+# Per-subject rate limit plus global concurrency limit (429 when exceeded)
+admit_request = admission.http_dependency()
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when available (skips jsonable_encoder)"""
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps_json(content)
+
 class Query(BaseModel):
     text: str
+    session_id: Optional[str] = None
     context: Optional[dict] = None
     options: Optional[dict] = None
 
-@router.post("/process")
-async def process_query(query: Query):
-    """Process a text query and return comprehensive response"""
+@router.post("/process", response_class=FastJSONResponse)
+async def process_query(query: Query, subject: str = Depends(admit_request)):
+    """
+    Process a text query and return comprehensive response.
+    options.fields (e.g. ["response.main_response", "analysis.sentiment"])
+    limits the response to those paths; unrequested analysis tasks are not run.
+    options.latency_budget_ms drops optional stages expected not to fit the
+    budget; they are listed in response.skipped_stages.
+    """
     try:
-        # NLP Analysis
-        nlp_analysis = await language_processor.process_text(query.text)
-        
-        # Get AI response
-        ai_response = await api_orchestrator.process_query(query.text)
+        options = query.options or {}
+        fields = options.get('fields')
+
+        # Requests without a session id start a new session
+        session_id = query.session_id or uuid.uuid4().hex
+        # One session read here and one write after the response
+        session = await context_store.load(session_id)
+
+        # Decide which stages run: requested fields, then the latency budget
+        plan = api_orchestrator.plan(query.text, options, nlp_tasks=analysis_tasks(fields, 'analysis'))
+
+        async def analyze():
+            if not plan['nlp_tasks']:
+                return {}
+            return await language_processor.process_text(query.text, tasks=plan['nlp_tasks'], options=options)
+
+        # NLP analysis runs alongside the AI response
+        nlp_analysis, ai_response = await asyncio.gather(
+            analyze(),
+            api_orchestrator.process_query(
+                query.text,
+                options=query.options,
+                plan=plan,
+                history=session.llm_history()
+            )
+        )
         
         # Update context
-        context = await context_manager.update_context(
+        context = await context_store.update_context(
+            session_id,
             query.text,
             ai_response,
-            nlp_analysis
+            nlp_analysis,
+            context=session
         )
         
-        return {
+        return FastJSONResponse(project({
             "status": "success",
+            "session_id": session_id,
             "response": ai_response,
             "analysis": nlp_analysis,
             "context": context
-        }
+        }, fields, always=("status", "session_id")))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -41,7 +89,10 @@ async def process_query(query: Query):
 async def get_context(session_id: str):
     """Get current context for a session"""
     try:
-        return context_manager.get_current_context()
+        context = await context_store.load(session_id, create=False)
+        if context is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        return context.get_current_context()
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -51,7 +102,8 @@ async def analyze_text(query: Query):
     try:
         analysis = await language_processor.process_text(
             query.text,
-            tasks=['syntax', 'semantics', 'sentiment', 'entities']
+            tasks=['syntax', 'semantics', 'sentiment', 'entities'],
+            options=query.options
         )
         return {"status": "success", "analysis": analysis}
     except Exception as e:
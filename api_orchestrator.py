@@ -1,69 +1,227 @@
 # core/api_integration/api_orchestrator.py
+import asyncio
+import math
+from datetime import datetime
+
 from .openai_handler import OpenAIHandler
 from .huggingface_handler import HuggingFaceHandler
+from .stage_executor import Stage, StageGraph
+from .stage_planner import StagePlanner, OPTIONAL_STAGES
+from core.monitoring import metrics
+from core.utils.single_flight import SingleFlight, request_key
 from core.database.mongodb_handler import MongoDBHandler
 from core.search.google_search import GoogleSearchEngine
 
+# Per-stage timeouts in seconds
+DEFAULT_STAGE_TIMEOUTS = {
+    'search': 3.0,
+    'database_context': 1.0,
+    'llm': 20.0,
+    'sentiment': 2.0,
+    'entities': 2.0,
+    'continuation': 4.0
+}
+
 class APIOrchestrator:
-    def __init__(self):
-        self.openai = OpenAIHandler()
+    def __init__(self, stage_timeouts=None, request_budget=25.0, embed=None, index_path=None):
+        # embed: text -> vector, enables the semantic LLM response cache
+        # and the in-process retrieval index (snapshotted to index_path)
+        self.openai = OpenAIHandler(embed=embed)
         self.huggingface = HuggingFaceHandler()
-        self.db = MongoDBHandler()
+        self.db = MongoDBHandler(embed=embed, index_path=index_path)
         self.search = GoogleSearchEngine()
+        self.stage_timeouts = {**DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {})}
+        self.request_budget = request_budget
+        # Identical concurrent queries share one pipeline run
+        self.in_flight = SingleFlight(name="process_query")
+        # Picks the stages that fit options['latency_budget_ms']
+        self.planner = StagePlanner()
+
+    def plan(self, user_input, options=None, nlp_tasks=None):
+        """Stage plan for a request (see StagePlanner.plan)"""
+        if not isinstance(user_input, str):
+            raise ValueError("Query text must be a string")
+        budget = (options or {}).get('latency_budget_ms')
+        return self.planner.plan(user_input, self._parse_budget(budget), nlp_tasks)
 
-    async def process_query(self, user_input):
+    @staticmethod
+    def _parse_budget(budget):
+        # Client-supplied; anything that is not a positive number means no budget
         try:
-            # 1. Search for relevant information
-            search_results = await self.search.search(user_input)
-            
-            # 2. Get context from database
-            db_context = self.db.get_relevant_context(user_input)
-            
-            # 3. Combine context
-            context = {
-                "search_results": search_results,
-                "database_context": db_context
-            }
-            
-            # 4. Generate main response using OpenAI
-            main_response = await self.openai.generate_response(
-                user_input,
-                context=context
-            )
-            
-            # 5. Enhance with HuggingFace processing
-            enhancements = await self._enhance_response(user_input, main_response)
-            
-            # 6. Store interaction
-            self._store_interaction(user_input, main_response, enhancements)
-            
-            return {
-                "main_response": main_response,
-                "enhancements": enhancements,
-                "context": context
-            }
-            
+            budget = float(budget)
+        except (TypeError, ValueError):
+            return None
+        return budget if math.isfinite(budget) and budget > 0 else None
+
+    async def process_query(self, user_input, options=None, plan=None, history=None):
+        """
+        Run the query pipeline, coalescing identical concurrent queries.
+        history: the session's earlier turns for the LLM prompt
+        """
+        plan = plan or self.plan(user_input, options)
+        history = history or []
+        # Only queries that would build the same prompt can share a result
+        prompt_turns = tuple(
+            (turn['user'], turn['assistant'])
+            for turn in history[-self.openai.prompt_builder.max_history_turns:]
+        )
+        return await self.in_flight.do(
+            (request_key(user_input, options), tuple(sorted(plan['skipped'])), prompt_turns),
+            lambda: self._process_query(user_input, options, plan, history)
+        )
+
+    async def _process_query(self, user_input, options, plan, history):
+        try:
+            # Search + DB context run together, sentiment/NER run alongside the LLM call
+            graph = self._build_graph(user_input, options, skip=plan['skipped'], history=history)
+            results, stages = await graph.run()
+            return await self._assemble_result(user_input, results, stages, plan)
+
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(upstream="orchestrator")
             print(f"Orchestration error: {str(e)}")
             return None
 
-    async def _enhance_response(self, user_input, main_response):
-        """Enhance the main response with additional processing"""
+    async def process_query_stream(self, user_input, options=None, plan=None, history=None):
+        """
+        Same pipeline as process_query, but yields events as they happen:
+        {'type': 'token', 'delta': ...} for each LLM token, then
+        {'type': 'enhancements', ...} and finally {'type': 'result', ...}
+        """
+        plan = plan or self.plan(user_input, options)
+        deltas = asyncio.Queue()
+        use_cache = (options or {}).get('cache', True)
+
+        async def stream_llm(search_results, db_context):
+            parts = []
+            prompt_tokens = {}
+            try:
+                async for delta in self.openai.stream_response(
+                    user_input,
+                    context={
+                        "search_results": search_results,
+                        "database_context": db_context
+                    },
+                    prompt_stats=prompt_tokens,
+                    use_cache=use_cache,
+                    history=history
+                ):
+                    parts.append(delta)
+                    deltas.put_nowait(delta)
+            finally:
+                deltas.put_nowait(None)
+            return {
+                'response': ''.join(parts),
+                'usage': None,
+                'prompt_tokens': prompt_tokens,
+                'model': self.openai.model
+            }
+
+        graph_task = asyncio.ensure_future(
+            self._build_graph(user_input, options, llm=stream_llm, skip=plan['skipped']).run()
+        )
+        try:
+            while True:
+                getter = asyncio.ensure_future(deltas.get())
+                await asyncio.wait({getter, graph_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    # The graph finished first; flush whatever is still queued
+                    getter.cancel()
+                    while not deltas.empty():
+                        delta = deltas.get_nowait()
+                        if delta is not None:
+                            yield {'type': 'token', 'delta': delta}
+                    break
+                delta = getter.result()
+                if delta is None:
+                    break
+                yield {'type': 'token', 'delta': delta}
+
+            results, stages = await graph_task
+            result = await self._assemble_result(user_input, results, stages, plan)
+            yield {'type': 'enhancements', 'enhancements': result['enhancements']}
+            yield {'type': 'result', 'result': result}
+        finally:
+            if not graph_task.done():
+                graph_task.cancel()
+
+    async def _assemble_result(self, user_input, results, stages, plan):
+        """Shape stage results into the orchestrator response and store it"""
+        context = {
+            "search_results": results['search'],
+            "database_context": results['database_context']
+        }
+        main_response = results['llm']
+        enhancements = {
+            "sentiment": results.get('sentiment'),
+            "entities": results.get('entities'),
+            "generated_continuation": results.get('continuation')
+        }
+
+        # Store interaction
+        await self._store_interaction(user_input, main_response, enhancements)
+
         return {
-            "sentiment": await self.huggingface.process_text(user_input, "classify"),
-            "entities": await self.huggingface.process_text(user_input, "ner"),
-            "generated_continuation": await self.huggingface.process_text(
-                main_response['response'], 
-                "generate"
-            )
+            "main_response": main_response,
+            "enhancements": enhancements,
+            "context": context,
+            "stages": stages,
+            "skipped_stages": plan['skipped']
         }
 
-    def _store_interaction(self, user_input, response, enhancements):
-        """Store the interaction in the database"""
+    def _build_graph(self, user_input, options=None, llm=None, skip=(), history=None):
+        """Describe the request pipeline as a stage graph, leaving out optional stages in skip"""
+        timeouts = self.stage_timeouts
+        options = options or {}
+
+        async def search():
+            return await self.search.search(user_input)
+
+        async def database_context():
+            return await self.db.get_relevant_context(user_input)
+
+        async def generate(search_results, db_context):
+            return await self.openai.generate_response(
+                user_input,
+                context={
+                    "search_results": search_results,
+                    "database_context": db_context
+                },
+                # options={'cache': False} bypasses the semantic response cache
+                use_cache=options.get('cache', True),
+                history=history
+            )
+
+        async def sentiment():
+            return await self.huggingface.process_text(user_input, "classify")
+
+        async def entities():
+            return await self.huggingface.process_text(user_input, "ner")
+
+        async def continuation(main_response):
+            if not main_response:
+                return None
+            return await self.huggingface.process_text(main_response['response'], "generate")
+
+        stages = [
+            Stage('search', search, timeout=timeouts['search'], fallback=[]),
+            Stage('database_context', database_context, timeout=timeouts['database_context'], fallback=[]),
+            Stage('sentiment', sentiment, timeout=timeouts['sentiment']),
+            Stage('entities', entities, timeout=timeouts['entities']),
+            Stage('llm', llm or generate, depends_on=('search', 'database_context'), timeout=timeouts['llm']),
+            Stage('continuation', continuation, depends_on=('llm',), timeout=timeouts['continuation'])
+        ]
+        return StageGraph(
+            [stage for stage in stages if not (stage.name in skip and stage.name in OPTIONAL_STAGES)],
+            deadline=self.request_budget
+        )
+
+    async def _store_interaction(self, user_input, response, enhancements):
+        """Queue the interaction for a background database write"""
         interaction_data = {
             "user_input": user_input,
             "response": response,
             "enhancements": enhancements,
             "timestamp": datetime.now()
         }
-        self.db.store_conversation(interaction_data)
+        await self.db.store_conversation(interaction_data)
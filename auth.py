@@ -1,29 +1,49 @@
 # app/middleware/auth.py
+from collections import OrderedDict
 from fastapi import Request, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 import jwt
+import time
 from datetime import datetime, timedelta
 
 class AuthMiddleware:
-    def __init__(self, secret_key: str):
+    def __init__(self, secret_key: str, cache_size: int = 10000):
         self.secret_key = secret_key
         self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+        # token -> verified payload, reused until the token's own expiry
+        self.cache_size = cache_size
+        self._verified = OrderedDict()
 
     async def verify_token(self, token: str):
+        payload = self._verified.get(token)
+        if payload is not None:
+            if payload.get('exp') is None or payload['exp'] > time.time():
+                self._verified.move_to_end(token)
+                return payload
+            del self._verified[token]
+            raise HTTPException(
+                status_code=401,
+                detail="Token has expired"
+            )
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=["HS256"])
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=401,
                 detail="Token has expired"
             )
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid token"
             )
 
+        self._verified[token] = payload
+        if len(self._verified) > self.cache_size:
+            self._verified.popitem(last=False)
+        return payload
+
     def create_token(self, data: dict, expires_delta: timedelta = None):
         to_encode = data.copy()
         if expires_delta:
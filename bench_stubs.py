@@ -0,0 +1,184 @@
+# benchmarks/stubs.py
+import asyncio
+import json
+import random
+import time
+from aiohttp import web
+from spacy.language import Language
+
+class UpstreamProfile:
+    """Latency (seconds, mean +/- jitter) and error rate for one stubbed upstream"""
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    async def delay(self):
+        await asyncio.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+
+    def should_fail(self):
+        return random.random() < self.error_rate
+
+class StubUpstreams:
+    """
+    One local HTTP server standing in for Google CSE, SerpAPI and the
+    OpenAI chat completions API (plain and streamed).
+    """
+
+    def __init__(self, google=None, serpapi=None, openai=None, reply_tokens=40):
+        self.profiles = {
+            'google': google or UpstreamProfile(),
+            'serpapi': serpapi or UpstreamProfile(),
+            'openai': openai or UpstreamProfile(latency=0.3)
+        }
+        self.reply_tokens = reply_tokens
+        self.counts = {name: 0 for name in self.profiles}
+        self._runner = None
+        self.base_url = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_get('/google', self._google)
+        app.router.add_get('/serpapi', self._serpapi)
+        app.router.add_post('/openai/v1/chat/completions', self._chat_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _respond(self, name, payload):
+        self.counts[name] += 1
+        profile = self.profiles[name]
+        await profile.delay()
+        if profile.should_fail():
+            return web.json_response({'error': f'stub {name} failure'}, status=500)
+        return web.json_response(payload)
+
+    async def _google(self, request):
+        query = request.query.get('q', '')
+        items = [
+            {'title': f"{query} result {i}", 'link': f"https://example.com/{i}", 'snippet': f"About {query} ({i})"}
+            for i in range(int(request.query.get('num', 5)))
+        ]
+        return await self._respond('google', {'items': items})
+
+    async def _serpapi(self, request):
+        query = request.query.get('q', '')
+        results = [
+            {'title': f"{query} serp {i}", 'link': f"https://example.org/{i}", 'snippet': f"Serp {query} ({i})"}
+            for i in range(int(request.query.get('num', 5)))
+        ]
+        return await self._respond('serpapi', {'organic_results': results})
+
+    async def _chat_completions(self, request):
+        body = await request.json()
+        words = [f"word{i}" for i in range(self.reply_tokens)]
+        if not body.get('stream'):
+            return await self._respond('openai', {
+                'id': 'stub',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ' '.join(words)},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)}
+            })
+
+        # Streamed reply: first token after the profile latency, the rest spread out
+        self.counts['openai'] += 1
+        profile = self.profiles['openai']
+        await profile.delay()
+        if profile.should_fail():
+            return web.json_response({'error': 'stub openai failure'}, status=500)
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for word in words:
+            chunk = {
+                'id': 'stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+# --- Small fake models, registered in place of the real ones ---
+
+def _sleep(latency_ms):
+    if latency_ms:
+        time.sleep(latency_ms / 1000)
+
+class FakePipeline:
+    """Callable like a HuggingFace pipeline; accepts a string or a list"""
+
+    def __init__(self, make_output, latency_ms=5):
+        self.make_output = make_output
+        self.latency_ms = latency_ms
+
+    def __call__(self, inputs, **kwargs):
+        _sleep(self.latency_ms)
+        if isinstance(inputs, list):
+            return [self.make_output(text) for text in inputs]
+        return self.make_output(inputs)
+
+class FakeT5Tokenizer:
+    def __call__(self, texts, **kwargs):
+        return {'input_ids': list(texts)}
+
+    def batch_decode(self, sequences, **kwargs):
+        return [text.replace("summarize: ", "")[:80] for text in sequences]
+
+class FakeT5Model:
+    def __init__(self, latency_ms=20):
+        self.latency_ms = latency_ms
+
+    def generate(self, input_ids=None, **kwargs):
+        _sleep(self.latency_ms)
+        return input_ids
+
+@Language.component("bench_fake_parser")
+def bench_fake_parser(doc):
+    # Marks every token as its own root so noun_chunks/sents work without a model
+    for token in doc:
+        token.dep_ = "ROOT"
+        token.pos_ = "NOUN" if token.is_alpha and token.is_title else "X"
+    return doc
+
+def install_fake_models(registry, latency_ms=5):
+    """Replace the heavy models in the registry with fast fakes"""
+    import spacy
+
+    def load_spacy():
+        nlp = spacy.blank('en')
+        nlp.add_pipe('sentencizer')
+        nlp.add_pipe('bench_fake_parser')
+        return nlp
+
+    registry.register('spacy', load_spacy, replace=True)
+    registry.register('word2vec', lambda: None, replace=True)
+    registry.register('t5-base', lambda: (FakeT5Tokenizer(), FakeT5Model(latency_ms * 4)), replace=True)
+    registry.register('sentiment-analysis', lambda: FakePipeline(
+        lambda text: {'label': 'POSITIVE', 'score': 0.99}, latency_ms), replace=True)
+    registry.register('ner', lambda: FakePipeline(lambda text: [], latency_ms), replace=True)
+    registry.register('text-generation', lambda: FakePipeline(
+        lambda text: [{'generated_text': text + " and so on."}], latency_ms * 4), replace=True)
+    registry.register('question-answering', lambda: FakePipeline(
+        lambda text: {'answer': '', 'score': 0.0}, latency_ms), replace=True)
+    registry.register('summarization', lambda: FakePipeline(
+        lambda text: [{'summary_text': text[:80]}], latency_ms * 4), replace=True)
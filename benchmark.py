@@ -0,0 +1,273 @@
+# benchmarks/load_benchmark.py
+"""
+Offline end-to-end load benchmark.
+
+Starts local stand-ins for Google, SerpAPI, OpenAI and Mongo, swaps the
+HF/spaCy/T5 models for small fakes, serves app.main in-process and drives
+POST /process and /ws/{client_id} at a target concurrency. Prints (and
+optionally writes) a JSON report with throughput and p50/p95/p99 latency
+end to end and per orchestrator stage.
+
+    python -m benchmarks.load_benchmark --concurrency 32 --requests 500 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import time
+import uuid
+
+from benchmarks.stubs import StubUpstreams, UpstreamProfile, install_fake_models
+
+QUERIES = [
+    "What is the latest news about renewable energy?",
+    "Explain how transformers work in machine learning",
+    "Who won the football match yesterday?",
+    "Summarize the history of the Roman Empire",
+    "How do I write an async web server in Python?",
+    "What are the health benefits of green tea?",
+    "hi",
+    "Compare electric cars with hybrid cars for a long commute"
+]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 2)
+
+def summarize(latencies):
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean': round(sum(latencies) / len(latencies), 2),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': round(max(latencies), 2)
+    }
+
+class Recorder:
+    """Collects end-to-end and per-stage latencies (milliseconds) for one mode"""
+
+    def __init__(self):
+        self.latencies = []
+        self.first_token = []
+        self.stages = {}
+        self.errors = 0
+        self.started = None
+        self.finished = None
+
+    def record(self, latency_ms, stages=None, ok=True):
+        if not ok:
+            self.errors += 1
+            return
+        self.latencies.append(latency_ms)
+        for name, info in (stages or {}).items():
+            self.stages.setdefault(name, []).append(info['duration_ms'])
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        completed = len(self.latencies)
+        report = {
+            'requests': completed + self.errors,
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(completed / elapsed, 2) if elapsed else None,
+            'latency_ms': summarize(self.latencies),
+            'stages_ms': {name: summarize(values) for name, values in sorted(self.stages.items())}
+        }
+        if self.first_token:
+            report['first_token_ms'] = summarize(self.first_token)
+        return report
+
+def make_query(args, n):
+    query = random.choice(QUERIES)
+    # Unique suffixes defeat the search/response caches unless --allow-cache-hits
+    return query if args.allow_cache_hits else f"{query} (#{n})"
+
+def make_options(args):
+    options = {}
+    if args.fields:
+        options['fields'] = args.fields
+    return options
+
+async def drive_http(session, base_url, args, recorder):
+    counter = iter(range(args.requests))
+
+    async def worker(worker_id):
+        session_id = f"bench-http-{worker_id}"
+        for n in counter:
+            payload = {'text': make_query(args, n), 'session_id': session_id, 'options': make_options(args)}
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{base_url}/process", json=payload) as response:
+                    body = await response.json(content_type=None)
+                    ok = response.status == 200 and body.get('status') == 'success'
+            except Exception:
+                body, ok = {}, False
+            stages = ((body.get('response') or {}).get('stages')) if ok else None
+            recorder.record((time.perf_counter() - start) * 1000, stages, ok)
+
+    recorder.started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    recorder.finished = time.perf_counter()
+
+async def drive_ws(session, base_url, args, recorder):
+    counter = iter(range(args.requests))
+    ws_url = base_url.replace('http://', 'ws://')
+
+    async def worker(worker_id):
+        async with session.ws_connect(f"{ws_url}/ws/bench-ws-{worker_id}") as ws:
+            for n in counter:
+                message_id = uuid.uuid4().hex
+                await ws.send_str(json.dumps({
+                    'message': make_query(args, n),
+                    'message_id': message_id,
+                    'stream': args.stream,
+                    'options': make_options(args)
+                }))
+                start = time.perf_counter()
+                first_token = None
+                stages, ok = None, False
+                try:
+                    while True:
+                        frame = json.loads((await ws.receive(timeout=args.timeout)).data)
+                        if not args.stream:
+                            ok = frame.get('status') == 'success'
+                            stages = (frame.get('response') or {}).get('stages') if ok else None
+                            break
+                        if frame.get('type') == 'token' and first_token is None:
+                            first_token = (time.perf_counter() - start) * 1000
+                        elif frame.get('type') in ('done', 'error', 'overloaded'):
+                            ok = frame['type'] == 'done'
+                            stages = frame.get('stages')
+                            break
+                except Exception:
+                    ok = False
+                if first_token is not None:
+                    recorder.first_token.append(first_token)
+                recorder.record((time.perf_counter() - start) * 1000, stages, ok)
+
+    recorder.started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    recorder.finished = time.perf_counter()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def build_id():
+    if os.environ.get('BENCH_BUILD'):
+        return os.environ['BENCH_BUILD']
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+async def run(args):
+    import aiohttp
+    import uvicorn
+
+    # Dummy credentials; every upstream is local
+    for key in ('OPENAI_API_KEY', 'GOOGLE_API_KEY', 'GOOGLE_CSE_ID', 'SERPAPI_API_KEY'):
+        os.environ.setdefault(key, 'bench')
+    os.environ.setdefault('MONGODB_URI', 'mongodb://127.0.0.1:1')
+
+    stubs = await StubUpstreams(
+        google=UpstreamProfile(args.google_latency, args.jitter, args.error_rate),
+        serpapi=UpstreamProfile(args.serpapi_latency, args.jitter, args.error_rate),
+        openai=UpstreamProfile(args.openai_latency, args.jitter, args.error_rate)
+    ).start()
+
+    from core.models.model_registry import registry
+    install_fake_models(registry, latency_ms=args.model_latency_ms)
+
+    import openai
+    from app import main
+    from core.database.memory_store import InMemoryDatabase
+    from core.database.mongodb_handler import MongoDBHandler
+
+    openai.api_base = f"{stubs.base_url}/openai/v1"
+    orchestrator = main.api_orchestrator
+    orchestrator.search.google_url = f"{stubs.base_url}/google"
+    orchestrator.search.serpapi_url = f"{stubs.base_url}/serpapi"
+    orchestrator.db = MongoDBHandler(
+        database=InMemoryDatabase(write_latency=args.mongo_latency),
+        embed=main.language_processor.embed_text
+    )
+    # All benchmark clients share one address; keep the global concurrency
+    # limit but not the per-subject rate limit
+    main.admission.rate = None
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, log_level='warning'))
+    server_task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        if server_task.done():
+            raise RuntimeError("Benchmark server failed to start")
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    report = {
+        'build': build_id(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': {}
+    }
+    try:
+        timeout = aiohttp.ClientTimeout(total=args.timeout)
+        connector = aiohttp.TCPConnector(limit=args.concurrency * 2)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            if args.mode in ('http', 'both'):
+                recorder = Recorder()
+                await drive_http(session, base_url, args, recorder)
+                report['results']['http'] = recorder.report()
+            if args.mode in ('ws', 'both'):
+                recorder = Recorder()
+                await drive_ws(session, base_url, args, recorder)
+                report['results']['ws'] = recorder.report()
+    finally:
+        server.should_exit = True
+        await server_task
+        await stubs.stop()
+
+    report['upstream_calls'] = stubs.counts
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end load benchmark")
+    parser.add_argument('--mode', choices=['http', 'ws', 'both'], default='both')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="requests per mode")
+    parser.add_argument('--stream', action='store_true', help="use streaming WebSocket messages")
+    parser.add_argument('--fields', nargs='*', default=None, help="options.fields to request")
+    parser.add_argument('--allow-cache-hits', action='store_true', help="repeat identical queries")
+    parser.add_argument('--google-latency', type=float, default=0.08)
+    parser.add_argument('--serpapi-latency', type=float, default=0.15)
+    parser.add_argument('--openai-latency', type=float, default=0.4)
+    parser.add_argument('--mongo-latency', type=float, default=0.005)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--model-latency-ms', type=float, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,49 @@
 # app/routes/chat.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from typing import List, Dict
+import asyncio
 import json
+import uuid
+
+from app.main import api_orchestrator, language_processor, context_store, admission
+from app.middleware.admission import AdmissionRejected
+from core.utils.projection import analysis_tasks, project
+from core.utils.serialization import available_formats, encode_frame
 
 router = APIRouter()
 
+# Per-connection limits
+MAX_CONCURRENT_MESSAGES = 4   # messages processed at once
+MAX_PENDING_MESSAGES = 16     # messages waiting to be processed
+MAX_OUTBOUND_FRAMES = 64      # frames waiting to be written to the socket
+SLOW_CONSUMER_TIMEOUT = 10.0  # seconds a worker waits for room in the outbound queue
+
+# Browsers cannot set headers on WebSocket requests, so the JWT is offered
+# as a subprotocol pair: new WebSocket(url, ['bearer', token]). It is never
+# read from the query string, which ends up in proxy and access logs.
+BEARER_SUBPROTOCOL = 'bearer'
+
 class ConnectionManager:
+    # Sockets are inherently local to the worker holding them; everything
+    # else about a client lives in the session store, keyed by client_id
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        # Frame format negotiated per connection ("json" or "msgpack")
+        self.formats: Dict[str, str] = {}
 
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, client_id: str, subprotocol: str = None):
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections[client_id] = websocket
+        requested = websocket.query_params.get('format', 'json')
+        self.formats[client_id] = requested if requested in available_formats() else 'json'
 
-    def disconnect(self, client_id: str):
+    def disconnect(self, client_id: str, websocket: WebSocket = None):
+        # A newer socket may have taken over the client_id; leave it registered
+        if websocket is not None and self.active_connections.get(client_id) is not websocket:
+            return
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self.formats.pop(client_id, None)
 
     async def send_message(self, message: str, client_id: str):
         if client_id in self.active_connections:
@@ -23,51 +51,303 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+class SlowConsumer(Exception):
+    """The client stopped reading and the outbound queue stayed full"""
+
+class MessagePipeline:
+    """
+    Message handling for one connection. Incoming messages wait in a
+    bounded queue and up to `concurrency` of them are processed at once;
+    every frame is tagged with the request_id of the message it answers.
+    Frames leave through a bounded queue drained by a single writer, so a
+    slow client stalls its own workers rather than buffering without limit.
+    A worker holds an admission slot while it produces frames, so a client
+    that leaves the queue full for SLOW_CONSUMER_TIMEOUT is disconnected
+    instead of pinning global slots. When the inbound queue is full, or
+    admission control refuses the message, it is answered with an
+    'overloaded' frame.
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: str, subject: str,
+                 concurrency=MAX_CONCURRENT_MESSAGES,
+                 max_pending=MAX_PENDING_MESSAGES,
+                 max_outbound=MAX_OUTBOUND_FRAMES):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.subject = subject
+        self.frame_format = manager.formats.get(client_id, 'json')
+        self.concurrency = concurrency
+        self.inbound = asyncio.Queue(maxsize=max_pending)
+        self.outbound = asyncio.Queue(maxsize=max_outbound)
+        self.slow_consumer = asyncio.Event()
+
+    async def run(self):
+        """
+        Read messages until the client disconnects (or is dropped as a slow
+        consumer), then cancel in-flight work
+        """
+        tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.ensure_future(self._writer()))
+        reader = asyncio.ensure_future(self._reader())
+        dropped = asyncio.ensure_future(self.slow_consumer.wait())
+        try:
+            await asyncio.wait({reader, dropped}, return_when=asyncio.FIRST_COMPLETED)
+            if reader.done():
+                reader.result()
+            else:
+                print(f"WebSocket client {self.client_id} is not reading; disconnecting")
+                try:
+                    await asyncio.wait_for(self.websocket.close(code=1008), 1.0)
+                except Exception:
+                    pass
+        finally:
+            for task in tasks + [reader, dropped]:
+                task.cancel()
+            await asyncio.gather(*tasks, reader, dropped, return_exceptions=True)
+
+    async def _reader(self):
+        while True:
+            data = await self.websocket.receive_text()
+            try:
+                message_data = json.loads(data)
+            except ValueError as e:
+                await self.outbound.put({'request_id': None, 'status': 'error', 'message': str(e)})
+                continue
+            if not isinstance(message_data, dict):
+                await self.outbound.put({
+                    'request_id': None,
+                    'status': 'error',
+                    'message': 'Message must be a JSON object'
+                })
+                continue
+
+            request_id = (message_data.get('request_id')
+                          or message_data.get('message_id')
+                          or uuid.uuid4().hex)
+            try:
+                self.inbound.put_nowait((request_id, message_data))
+            except asyncio.QueueFull:
+                await self.outbound.put(overloaded_frame(request_id, 'queue_full', 1.0))
+
+    async def _worker(self):
+        while True:
+            request_id, message_data = await self.inbound.get()
+            try:
+                async with admission.admit(self.subject):
+                    # Streaming requests produce several frames
+                    async for frame in handle_message(message_data, self.client_id):
+                        await self._put_holding_slot({'request_id': request_id, **frame})
+            except SlowConsumer:
+                return
+            except AdmissionRejected as e:
+                await self.outbound.put(overloaded_frame(request_id, e.reason, e.retry_after))
+            except Exception as e:
+                # Answer the message and keep the worker alive for the next one
+                print(f"WebSocket message error ({self.client_id}): {str(e)}")
+                await self.outbound.put({'request_id': request_id, 'status': 'error', 'message': str(e)})
+
+    async def _put_holding_slot(self, frame):
+        # Waiting here holds a global admission slot, so only for so long
+        try:
+            await asyncio.wait_for(self.outbound.put(frame), SLOW_CONSUMER_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.slow_consumer.set()
+            raise SlowConsumer()
+
+    async def _writer(self):
+        while True:
+            frame = await self.outbound.get()
+            try:
+                # This pipeline's own socket, even if the client_id is reused
+                encoded = encode_frame(frame, self.frame_format)
+                if isinstance(encoded, bytes):
+                    await self.websocket.send_bytes(encoded)
+                else:
+                    await self.websocket.send_text(encoded)
+            except Exception as e:
+                # A closed socket also surfaces in run() as WebSocketDisconnect
+                print(f"WebSocket send error ({self.client_id}): {str(e)}")
+
+def offered_subprotocols(websocket: WebSocket):
+    header = websocket.headers.get('sec-websocket-protocol', '')
+    return [protocol.strip() for protocol in header.split(',') if protocol.strip()]
+
+def bearer_authorization(websocket: WebSocket):
+    """Authorization value from the Authorization header or the 'bearer' subprotocol pair"""
+    if websocket.headers.get('authorization'):
+        return websocket.headers['authorization']
+    protocols = offered_subprotocols(websocket)
+    if BEARER_SUBPROTOCOL in protocols:
+        position = protocols.index(BEARER_SUBPROTOCOL)
+        if position + 1 < len(protocols):
+            return f"Bearer {protocols[position + 1]}"
+    return None
+
+def overloaded_frame(request_id, reason, retry_after):
+    return {
+        'request_id': request_id,
+        'type': 'overloaded',
+        'status': 'error',
+        'reason': reason,
+        'retry_after': retry_after,
+        'message': 'Server busy, retry later'
+    }
+
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
     try:
-        while True:
-            data = await websocket.receive_text()
-            
-            # Process the message
-            response = await process_message(data, client_id)
-            
-            # Send response back to client
-            await manager.send_message(json.dumps(response), client_id)
-            
+        subject = await admission.identify(
+            bearer_authorization(websocket),
+            admission.client_address(
+                websocket.client.host if websocket.client else None,
+                websocket.headers.get('x-forwarded-for')
+            )
+        )
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    # Browsers drop the connection unless one offered subprotocol is echoed;
+    # echo 'bearer', never the token itself
+    subprotocol = BEARER_SUBPROTOCOL if BEARER_SUBPROTOCOL in offered_subprotocols(websocket) else None
+    await manager.connect(websocket, client_id, subprotocol)
+    try:
+        await MessagePipeline(websocket, client_id, subject).run()
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        pass
+    finally:
+        manager.disconnect(client_id, websocket)
+
+async def handle_message(message_data: dict, client_id: str):
+    """Yield the response frames for one incoming message"""
+    if message_data.get('stream'):
+        async for frame in stream_message(message_data, client_id):
+            yield frame
+    else:
+        yield await process_message(message_data, client_id)
 
-async def process_message(data: str, client_id: str):
+async def process_message(message_data: dict, client_id: str):
     """Process incoming message and generate response"""
     try:
-        # Parse incoming data
-        message_data = json.loads(data)
         user_input = message_data.get('message', '')
+        options = message_data.get('options') or {}
+        fields = options.get('fields')
         
-        # Process with NLP
-        nlp_analysis = await language_processor.process_text(user_input)
-        
-        # Get AI response
-        ai_response = await api_orchestrator.process_query(user_input)
+        # Only the tasks the client asked for and that fit its latency budget
+        plan = api_orchestrator.plan(user_input, options, nlp_tasks=analysis_tasks(fields, 'nlp_analysis'))
+        # One session read here and one write after the response
+        session = await context_store.load(client_id)
+
+        async def analyze():
+            if not plan['nlp_tasks']:
+                return {}
+            return await language_processor.process_text(user_input, tasks=plan['nlp_tasks'], options=options)
+
+        # NLP analysis runs alongside the AI response
+        nlp_analysis, ai_response = await asyncio.gather(
+            analyze(),
+            api_orchestrator.process_query(
+                user_input,
+                options=options,
+                plan=plan,
+                history=session.llm_history()
+            )
+        )
         
         # Update context
-        context = await context_manager.update_context(
+        context = await context_store.update_context(
+            client_id,
             user_input, 
             ai_response, 
-            nlp_analysis
+            nlp_analysis,
+            context=session
         )
         
-        return {
+        return project({
             'status': 'success',
             'response': ai_response,
             'nlp_analysis': nlp_analysis,
             'context': context
-        }
+        }, fields)
         
     except Exception as e:
         return {
             'status': 'error',
             'message': str(e)
         }
+
+async def stream_message(message_data: dict, client_id: str):
+    """
+    Streaming variant of process_message. Every frame carries the
+    message_id and a sequence number: 'start', one 'token' frame per LLM
+    token, then 'nlp_analysis', 'enhancements' and a final 'done' frame
+    (or 'error').
+    """
+    message_id = message_data.get('message_id') or uuid.uuid4().hex
+    seq = 0
+
+    def frame(frame_type, **payload):
+        nonlocal seq
+        seq += 1
+        return {'message_id': message_id, 'seq': seq, 'type': frame_type, **payload}
+
+    nlp_task = None
+    try:
+        user_input = message_data.get('message', '')
+        options = message_data.get('options') or {}
+        plan = api_orchestrator.plan(user_input, options, nlp_tasks=analysis_tasks(options.get('fields'), 'nlp_analysis'))
+
+        # NLP analysis runs while the LLM streams
+        if plan['nlp_tasks']:
+            nlp_task = asyncio.ensure_future(language_processor.process_text(
+                user_input,
+                tasks=plan['nlp_tasks'],
+                options=options
+            ))
+
+        yield frame('start')
+        session = await context_store.load(client_id)
+
+        ai_response = None
+        enhancements = None
+        async for event in api_orchestrator.process_query_stream(
+            user_input,
+            options=options,
+            plan=plan,
+            history=session.llm_history()
+        ):
+            if event['type'] == 'token':
+                yield frame('token', delta=event['delta'])
+            elif event['type'] == 'enhancements':
+                enhancements = event['enhancements']
+            elif event['type'] == 'result':
+                ai_response = event['result']
+
+        nlp_analysis = {}
+        if nlp_task is not None:
+            nlp_analysis = await nlp_task
+            yield frame('nlp_analysis', nlp_analysis=nlp_analysis)
+        yield frame('enhancements', enhancements=enhancements)
+
+        # Update context
+        context = await context_store.update_context(
+            client_id,
+            user_input,
+            ai_response,
+            nlp_analysis,
+            context=session
+        )
+
+        yield frame(
+            'done',
+            status='success',
+            stages=ai_response['stages'] if ai_response else None,
+            skipped_stages=plan['skipped'],
+            context=context
+        )
+
+    except Exception as e:
+        yield frame('error', status='error', message=str(e))
+    finally:
+        if nlp_task is not None and not nlp_task.done():
+            nlp_task.cancel()
@@ -6,4 +6,8 @@ const config = {
     defaultTheme: 'light',
     maxMessageLength: 2000,
     refreshInterval: 30000, // 30 seconds
+    stream: true,           // Stream LLM tokens over the WebSocket
+    format: 'json',         // WebSocket frame format: 'json' or 'msgpack'
+    fields: null,           // Response fields to request, e.g. ['response.main_response'] (null = all)
+    authToken: null,        // JWT for the WebSocket, sent as the 'bearer' subprotocol (never in the URL)
 };
@@ -1,30 +1,44 @@
 # core/nlp/context_manager.py
-from collections import deque
+from collections import deque, OrderedDict
+import sys
+import time
 import numpy as np
 from datetime import datetime, timedelta
 
+# Rough fixed cost of one stored entry (dict, timestamp, references)
+ENTRY_OVERHEAD = 400
+
 class ContextManager:
-    def __init__(self, max_history=10):
+    def __init__(self, max_history=10, max_topics=50, max_open_questions=10):
         self.context_history = deque(maxlen=max_history)
-        self.topic_tracking = {}
+        self.max_topics = max_topics
+        # topic -> stats, ordered by last mention
+        self.topic_tracking = OrderedDict()
         self.user_preferences = {}
         self.conversation_state = {
             'current_topic': None,
-            'open_questions': [],
+            'open_questions': deque(maxlen=max_open_questions),
             'last_update': datetime.now()
         }
+        # Approximate memory footprint, maintained incrementally
+        self.size = sys.getsizeof(self)
+        self.last_access = time.monotonic()
 
     async def update_context(self, user_input, ai_response, nlp_analysis):
         """Update conversation context with new interaction"""
+        # Only the text of the exchange is kept, not the full analysis payloads
         context_entry = {
             'timestamp': datetime.now(),
             'user_input': user_input,
-            'ai_response': ai_response,
-            'nlp_analysis': nlp_analysis,
+            'ai_response': self._response_text(ai_response),
             'topic': self._extract_topic(nlp_analysis)
         }
         
+        if len(self.context_history) == self.context_history.maxlen:
+            self.size -= self._entry_size(self.context_history[0])
         self.context_history.append(context_entry)
+        self.size += self._entry_size(context_entry)
+
         self._update_topic_tracking(context_entry)
         self._update_conversation_state(context_entry)
         
@@ -35,12 +49,83 @@ class ContextManager:
         return {
             'recent_history': list(self.context_history),
             'current_topic': self.conversation_state['current_topic'],
-            'topic_history': self.topic_tracking,
-            'open_questions': self.conversation_state['open_questions']
+            'topic_history': dict(self.topic_tracking),
+            'open_questions': list(self.conversation_state['open_questions'])
+        }
+
+    def llm_history(self):
+        """Recent exchanges as LLM prompt history turns"""
+        return [
+            {'user': entry['user_input'], 'assistant': entry['ai_response']}
+            for entry in self.context_history if entry['ai_response']
+        ]
+
+    def to_state(self):
+        """Plain-data snapshot for serialization (timestamps as epoch seconds)"""
+        return {
+            'history': [self._dump_entry(entry) for entry in self.context_history],
+            'topics': [
+                [topic, stats['first_mention'].timestamp(), stats['last_mention'].timestamp(),
+                 stats['mention_count']]
+                for topic, stats in self.topic_tracking.items()
+            ],
+            'current_topic': self.conversation_state['current_topic'],
+            'open_questions': [self._dump_entry(q) for q in self.conversation_state['open_questions']],
+            'last_update': self.conversation_state['last_update'].timestamp(),
+            'user_preferences': self.user_preferences
         }
 
+    @classmethod
+    def from_state(cls, state, **options):
+        """Rebuild a ContextManager from to_state() output"""
+        context = cls(**options)
+        for entry in state['history']:
+            entry = context._load_entry(entry)
+            context.context_history.append(entry)
+            context.size += context._entry_size(entry)
+        for topic, first, last, count in state['topics'][-context.max_topics:]:
+            context.topic_tracking[topic] = {
+                'first_mention': datetime.fromtimestamp(first),
+                'last_mention': datetime.fromtimestamp(last),
+                'mention_count': count
+            }
+            context.size += ENTRY_OVERHEAD + len(topic)
+        questions = context.conversation_state['open_questions']
+        for question in state['open_questions']:
+            question = context._load_entry(question)
+            questions.append(question)
+            context.size += context._entry_size(question)
+        context.conversation_state['current_topic'] = state['current_topic']
+        context.conversation_state['last_update'] = datetime.fromtimestamp(state['last_update'])
+        context.user_preferences = state.get('user_preferences') or {}
+        return context
+
+    @staticmethod
+    def _dump_entry(entry):
+        return {**entry, 'timestamp': entry['timestamp'].timestamp()}
+
+    @staticmethod
+    def _load_entry(entry):
+        return {**entry, 'timestamp': datetime.fromtimestamp(entry['timestamp'])}
+
+    @staticmethod
+    def _response_text(ai_response):
+        try:
+            return ai_response['main_response']['response']
+        except (KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _entry_size(entry):
+        return ENTRY_OVERHEAD + sum(
+            len(entry.get(key) or '') for key in ('user_input', 'ai_response', 'topic', 'question')
+        )
+
     def _extract_topic(self, nlp_analysis):
         """Extract main topic from NLP analysis"""
+        if not nlp_analysis:
+            return None
+
         if 'entities' in nlp_analysis:
             # Prioritize named entities
             entities = nlp_analysis['entities']
@@ -65,9 +150,15 @@ class ContextManager:
                     'last_mention': context_entry['timestamp'],
                     'mention_count': 1
                 }
+                self.size += ENTRY_OVERHEAD + len(topic)
+                # Forget the least recently mentioned topic
+                if len(self.topic_tracking) > self.max_topics:
+                    evicted, _ = self.topic_tracking.popitem(last=False)
+                    self.size -= ENTRY_OVERHEAD + len(evicted)
             else:
                 self.topic_tracking[topic]['last_mention'] = context_entry['timestamp']
                 self.topic_tracking[topic]['mention_count'] += 1
+                self.topic_tracking.move_to_end(topic)
 
     def _update_conversation_state(self, context_entry):
         """Update current conversation state"""
@@ -79,7 +170,12 @@ class ContextManager:
             
         # Track questions
         if '?' in context_entry['user_input']:
-            self.conversation_state['open_questions'].append({
+            questions = self.conversation_state['open_questions']
+            question = {
                 'question': context_entry['user_input'],
                 'timestamp': context_entry['timestamp']
-            })
+            }
+            if len(questions) == questions.maxlen:
+                self.size -= self._entry_size(questions[0])
+            questions.append(question)
+            self.size += self._entry_size(question)
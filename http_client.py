@@ -0,0 +1,38 @@
+# core/search/http_client.py
+import aiohttp
+
+# Shared, connection-pooled client session (one per worker process)
+_session = None
+
+def get_session(limit=100, limit_per_host=20, keepalive_timeout=30, timeout=10):
+    """Return the process-wide pooled HTTP session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+    return _session
+
+async def close_session():
+    """Close the shared session (call on application shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def get_json(url, params=None, timeout=None):
+    """GET a URL over the shared session and decode the JSON body"""
+    session = get_session()
+    kwargs = {'params': params}
+    if timeout:
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+    async with session.get(url, **kwargs) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
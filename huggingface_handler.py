@@ -1,79 +1,109 @@
 # core/api_integration/huggingface_handler.py
-from transformers import pipeline, AutoModelForCausalLM, AutoTokenizer
-import torch
+from core.models.model_registry import registry
+from core.monitoring import metrics
+from core.utils.batching import MicroBatcher
+
+# Per-task micro-batching limits
+DEFAULT_BATCH_CONFIG = {
+    'generate': {'max_batch_size': 4, 'max_wait_ms': 10},
+    'classify': {'max_batch_size': 16, 'max_wait_ms': 5},
+    'ner': {'max_batch_size': 16, 'max_wait_ms': 5}
+}
 
 class HuggingFaceHandler:
-    def __init__(self):
-        self.initialize_pipelines()
+    def __init__(self, batch_config=None):
+        batch_config = batch_config or {}
+        self.batch_config = {
+            task: {**defaults, **batch_config.get(task, {})}
+            for task, defaults in DEFAULT_BATCH_CONFIG.items()
+        }
+        self.batchers = {
+            task: MicroBatcher(process_batch, name=f"hf.{task}", **self.batch_config[task])
+            for task, process_batch in (
+                ('generate', self._generate_batch),
+                ('classify', self._classify_batch),
+                ('ner', self._ner_batch)
+            )
+        }
         
     def initialize_pipelines(self):
-        """Initialize various HuggingFace pipelines"""
-        try:
-            # Text Generation
-            self.text_generator = pipeline(
-                "text-generation",
-                model="gpt2",
-                device=0 if torch.cuda.is_available() else -1
-            )
-            
-            # Text Classification
-            self.classifier = pipeline(
-                "text-classification",
-                model="distilbert-base-uncased-finetuned-sst-2-english"
-            )
-            
-            # Named Entity Recognition
-            self.ner = pipeline(
-                "ner",
-                aggregation_strategy="simple"
-            )
-            
-            # Question Answering
-            self.qa = pipeline("question-answering")
-            
-        except Exception as e:
-            print(f"Error initializing HuggingFace pipelines: {str(e)}")
+        """Load the HuggingFace pipelines up front (they otherwise load on first use)"""
+        registry.warmup(['text-generation', 'sentiment-analysis', 'ner', 'question-answering'])
+
+    # Pipelines are shared process-wide through the model registry
+    @property
+    def text_generator(self):
+        return registry.get('text-generation')
+
+    @property
+    def classifier(self):
+        return registry.get('sentiment-analysis')
+
+    @property
+    def ner(self):
+        return registry.get('ner')
+
+    @property
+    def qa(self):
+        return registry.get('question-answering')
 
     async def process_text(self, text, task="generate"):
         """Process text using various pipelines"""
         try:
-            if task == "generate":
-                return await self._generate_text(text)
-            elif task == "classify":
-                return await self._classify_text(text)
-            elif task == "ner":
-                return await self._extract_entities(text)
-            elif task == "qa":
-                return await self._answer_question(text)
-            else:
-                raise ValueError(f"Unknown task: {task}")
+            with metrics.span(f"hf.{task}"):
+                if task == "generate":
+                    return await self._generate_text(text)
+                elif task == "classify":
+                    return await self._classify_text(text)
+                elif task == "ner":
+                    return await self._extract_entities(text)
+                elif task == "qa":
+                    return await self._answer_question(text)
+                else:
+                    raise ValueError(f"Unknown task: {task}")
                 
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(upstream="huggingface")
             print(f"HuggingFace processing error: {str(e)}")
             return None
 
     async def _generate_text(self, prompt):
         """Generate text continuation"""
         try:
-            response = self.text_generator(
-                prompt,
-                max_length=100,
-                num_return_sequences=1,
-                temperature=0.7
-            )
-            return response[0]['generated_text']
+            return await self.batchers['generate'].submit(prompt)
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(upstream="huggingface")
             print(f"Text generation error: {str(e)}")
             return None
 
     async def _classify_text(self, text):
         """Classify text sentiment"""
-        return self.classifier(text)
+        return await self.batchers['classify'].submit(text)
 
     async def _extract_entities(self, text):
         """Extract named entities"""
-        return self.ner(text)
+        return await self.batchers['ner'].submit(text)
 
     async def _answer_question(self, context, question):
         """Answer questions based on context"""
         return self.qa(question=question, context=context)
+
+    def _generate_batch(self, prompts):
+        """Run one batched text-generation call"""
+        responses = self.text_generator(
+            prompts,
+            max_length=100,
+            num_return_sequences=1,
+            temperature=0.7,
+            batch_size=len(prompts)
+        )
+        return [response[0]['generated_text'] for response in responses]
+
+    def _classify_batch(self, texts):
+        """Run one batched classification call"""
+        # Keep the single-call output shape: a one-element list per text
+        return [[result] for result in self.classifier(texts, batch_size=len(texts))]
+
+    def _ner_batch(self, texts):
+        """Run one batched NER call"""
+        return self.ner(texts, batch_size=len(texts))
@@ -1,15 +1,86 @@
+import fcntl
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
 import tensorflow as tf
 import numpy as np
-from transformers import pipeline
+from sklearn.feature_extraction.text import HashingVectorizer
 from core.config import Config
+from core.models.model_registry import registry
+from core.monitoring import metrics
+
+# Output classes of the local model: it learns to predict the sentiment
+# pipeline's label from the text embedding alone
+SENTIMENT_LABELS = ('NEGATIVE', 'POSITIVE')
+CHECKPOINT_PATH = 'models/knowledge_base/local_sentiment.weights.h5'
 
 class KnowledgeBase:
-    def __init__(self):
-        self.sentiment_analyzer = pipeline('sentiment-analysis')
-        self.qa_pipeline = pipeline('question-answering')
-        self.summarizer = pipeline('summarization')
+    """
+    Online learning for the local model, off the request path: a small
+    classifier distilled from the sentiment pipeline, text embedding in,
+    sentiment label out.
+
+    learn_from_interaction only queues the interaction. A background
+    thread periodically labels queued inputs in small batches, keeps the
+    (embedding, label) pairs in a bounded replay buffer, runs mini-batch
+    fit steps on random samples from it and checkpoints the weights
+    atomically. Only one process per checkpoint trains (it holds a lock
+    file next to the checkpoint); in the others learn_from_interaction is
+    a no-op. TensorFlow is limited to train_threads threads and every
+    phase is duty-cycled so training uses at most cpu_share of the
+    wall-clock time.
+    """
+
+    def __init__(self, embed=None, pending_size=1000, replay_size=10000, batch_size=32,
+                 steps_per_cycle=4, train_interval=30, cpu_share=0.25,
+                 featurize_batch_size=8, train_threads=1,
+                 checkpoint_path=CHECKPOINT_PATH):
+        # embed: text -> fixed-size vector; hashed term frequencies by default
+        self.hashing = HashingVectorizer(n_features=2 ** 10, alternate_sign=False, norm='l2')
+        self.embed = embed or (lambda text: self.hashing.transform([text]).toarray()[0])
+        self.pending = deque(maxlen=pending_size)
+        self.replay = deque(maxlen=replay_size)
+        self.batch_size = batch_size
+        self.steps_per_cycle = steps_per_cycle
+        self.train_interval = train_interval
+        self.cpu_share = cpu_share
+        self.featurize_batch_size = featurize_batch_size
+        self.checkpoint_path = checkpoint_path
+        self.input_dim = None
+        self._stop = threading.Event()
+        self._trainer = None
+        self._trainer_lock = None
+        self._lock_retry_at = 0
+        self.stats = {'queued': 0, 'dropped': 0, 'skipped': 0, 'trained_steps': 0, 'checkpoints': 0}
+        self._limit_threads(train_threads)
         self.initialize_local_model()
 
+    @staticmethod
+    def _limit_threads(threads):
+        # Keras fit would otherwise use every core; only possible before TF starts
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(threads)
+        except RuntimeError as e:
+            print(f"TensorFlow thread limit not applied: {str(e)}")
+
+    # Pipelines come from the process-wide model registry; sentiment uses a
+    # trainer-only instance, since its fast tokenizer is not thread-safe
+    @property
+    def sentiment_analyzer(self):
+        return registry.get('sentiment-analysis-trainer')
+
+    @property
+    def qa_pipeline(self):
+        return registry.get('question-answering')
+
+    @property
+    def summarizer(self):
+        return registry.get('summarization')
+
     def initialize_local_model(self):
         # Create a simple neural network for local processing
         self.model = tf.keras.Sequential([
@@ -17,7 +88,7 @@ class KnowledgeBase:
             tf.keras.layers.Dropout(0.2),
             tf.keras.layers.Dense(128, activation='relu'),
             tf.keras.layers.Dense(64, activation='relu'),
-            tf.keras.layers.Dense(32, activation='softmax')
+            tf.keras.layers.Dense(len(SENTIMENT_LABELS), activation='softmax')
         ])
         
         self.model.compile(
@@ -27,25 +98,156 @@ class KnowledgeBase:
         )
 
     async def learn_from_interaction(self, user_input, response, context):
-        """Process and learn from each interaction"""
+        """Queue an interaction for background training (never blocks on models)"""
+        if not self._ensure_trainer():
+            return {'input': user_input, 'response': response, 'context': context, 'queued': False}
+        if len(self.pending) == self.pending.maxlen:
+            self.stats['dropped'] += 1
+        self.pending.append({
+            'input': user_input,
+            'response': response,
+            'context': context
+        })
+        self.stats['queued'] += 1
+        return {'input': user_input, 'response': response, 'context': context, 'queued': True}
+
+    def _ensure_trainer(self):
+        """Start the trainer if this process holds the trainer lock; False if it does not"""
+        # Started on first use, so it runs in the worker process after any fork
+        if not self._acquire_trainer_lock():
+            return False
+        if self._trainer is None or not self._trainer.is_alive():
+            self._stop.clear()
+            self._trainer = threading.Thread(target=self._train_loop, name="kb-trainer", daemon=True)
+            self._trainer.start()
+        return True
+
+    def _acquire_trainer_lock(self):
+        # The lock is released when the holder exits, so another worker
+        # takes over training within train_interval
+        if self._trainer_lock is not None:
+            return True
+        now = time.monotonic()
+        if now < self._lock_retry_at:
+            return False
+        self._lock_retry_at = now + self.train_interval
+
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.checkpoint_path + '.lock', 'w')
         try:
-            # Analyze sentiment
-            sentiment = self.sentiment_analyzer(user_input)
-            
-            # Generate summary
-            summary = self.summarizer(user_input, max_length=50, min_length=10)
-            
-            # Store learning data
-            learning_data = {
-                'input': user_input,
-                'response': response,
-                'context': context,
-                'sentiment': sentiment,
-                'summary': summary
-            }
-            
-            return learning_data
-            
-        except Exception as e:
-            print(f"Learning error: {str(e)}")
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._trainer_lock = lock_file
+        return True
+
+    def stop(self, timeout=None):
+        """Stop the trainer and write a final checkpoint"""
+        self._stop.set()
+        if self._trainer is not None:
+            self._trainer.join(timeout)
+            self._trainer = None
+        if self.input_dim is not None:
+            self.save_checkpoint()
+        if self._trainer_lock is not None:
+            self._trainer_lock.close()
+            self._trainer_lock = None
+
+    def _train_loop(self):
+        while not self._stop.wait(self.train_interval):
+            try:
+                self.train_cycle()
+            except Exception as e:
+                print(f"Learning error: {str(e)}")
+
+    def train_cycle(self):
+        """Featurize queued interactions, then run steps_per_cycle mini-batch fits"""
+        self._featurize_pending()
+
+        if len(self.replay) < self.batch_size:
+            return
+        for _ in range(self.steps_per_cycle):
+            if self._stop.is_set():
+                break
+            start = time.perf_counter()
+            batch = random.sample(self.replay, self.batch_size)
+            features = np.stack([x for x, _ in batch])
+            labels = tf.keras.utils.to_categorical([y for _, y in batch], len(SENTIMENT_LABELS))
+            with metrics.span("kb.train_step"):
+                self.model.fit(features, labels, batch_size=self.batch_size, epochs=1, verbose=0)
+            self.stats['trained_steps'] += 1
+            self._throttle(time.perf_counter() - start)
+        self.save_checkpoint()
+
+    def _throttle(self, busy):
+        # Sleep so that busy time stays within cpu_share of the cycle
+        if 0 < self.cpu_share < 1:
+            self._stop.wait(busy * (1 - self.cpu_share) / self.cpu_share)
+
+    def _featurize_pending(self):
+        """Label and embed everything queued so far, featurize_batch_size inputs at a time"""
+        while self.pending and not self._stop.is_set():
+            interactions = []
+            while self.pending and len(interactions) < self.featurize_batch_size:
+                interactions.append(self.pending.popleft())
+
+            # Small batches keep each sentiment pipeline call short, and the
+            # throttle after each one spaces them out
+            start = time.perf_counter()
+            texts = [item['input'] for item in interactions]
+            with metrics.span("kb.featurize"):
+                sentiments = self.sentiment_analyzer(texts, truncation=True)
+                for text, sentiment in zip(texts, sentiments):
+                    example = self._example(text, sentiment)
+                    if example is None:
+                        self.stats['skipped'] += 1
+                        continue
+                    self.replay.append(example)
+            self._throttle(time.perf_counter() - start)
+
+    def _example(self, text, sentiment):
+        """(features, label) for one input, or None if it cannot be used"""
+        if sentiment['label'] not in SENTIMENT_LABELS:
             return None
+        vector = self.embed(text)
+        if vector is None:
+            return None
+        features = np.asarray(vector, dtype=np.float32)
+        if self.input_dim is None:
+            self._build(len(features))
+        if len(features) != self.input_dim:
+            return None
+        return features, SENTIMENT_LABELS.index(sentiment['label'])
+
+    def _build(self, input_dim):
+        """Fix the input size and resume from the last checkpoint if it matches"""
+        self.input_dim = input_dim
+        self.model.build((None, input_dim))
+        if os.path.exists(self.checkpoint_path):
+            try:
+                self.model.load_weights(self.checkpoint_path)
+            except Exception as e:
+                print(f"Checkpoint load error: {str(e)}")
+
+    def save_checkpoint(self):
+        """Write the weights to a temp file, then atomically replace the checkpoint"""
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Unique name in the same directory (so os.replace is atomic), ending
+        # in .weights.h5 so Keras keeps the format
+        fd, tmp_path = tempfile.mkstemp(dir=directory or '.', suffix='.weights.h5')
+        os.close(fd)
+        try:
+            self.model.save_weights(tmp_path)
+            os.replace(tmp_path, self.checkpoint_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.stats['checkpoints'] += 1
+
+    def get_stats(self):
+        return {**self.stats, 'pending': len(self.pending), 'replay': len(self.replay)}
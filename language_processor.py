@@ -1,38 +1,78 @@
 # core/nlp/language_processor.py
+import asyncio
+import re
+import time
 import spacy
+from spacy.tokens import Doc
 import nltk
 from textblob import TextBlob
-from gensim.models import Word2Vec
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 import numpy as np
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-import torch
+from core.models.model_registry import registry
+from core.monitoring import metrics
+from core.utils.batching import MicroBatcher
+from .result_cache import TaskResultCache
+from .summarizer import T5Summarizer
+
+# Tasks that need a spaCy parse
+DOC_TASKS = {'syntax', 'sentiment', 'entities'}
+
+# Seconds to wait before retrying a failed Word2Vec load
+WORD2VEC_RETRY_INTERVAL = 60
 
 class LanguageProcessor:
-    def __init__(self):
-        # Initialize NLP models
-        self.nlp = spacy.load('en_core_web_trf')  # Using transformer pipeline
-        self.initialize_models()
+    def __init__(self, parse_batch_size=16, parse_max_wait_ms=5,
+                 cache_max_bytes=64 * 1024 * 1024,
+                 summary_profile='quality', summary_min_words=20):
+        # spaCy, Word2Vec and T5 are loaded lazily through the model registry
         self.load_nltk_resources()
+
+        # Concurrent requests are parsed together through nlp.pipe
+        self.parse_batch_size = parse_batch_size
+        self.parser = MicroBatcher(
+            self._parse_batch,
+            max_batch_size=parse_batch_size,
+            max_wait_ms=parse_max_wait_ms,
+            name="spacy"
+        )
         
-        # Initialize T5 for text processing
-        self.t5_tokenizer = T5Tokenizer.from_pretrained('t5-base')
-        self.t5_model = T5ForConditionalGeneration.from_pretrained('t5-base')
-        
-        # Initialize vectorizer
+        # T5 summarization runs batched on its own worker pool
+        self.summarizer = T5Summarizer(
+            profile=summary_profile,
+            min_words=summary_min_words
+        )
+
+        # Initialize vectorizers
         self.tfidf = TfidfVectorizer()
+        # Stateless term-frequency vectors for when Word2Vec is unavailable
+        self.hashing = HashingVectorizer(n_features=2 ** 12, alternate_sign=False, norm='l2')
         
-        # Cache for processed results
-        self.cache = {}
+        # Per-task cache for processed results, bounded by size
+        self.cache = TaskResultCache(max_bytes=cache_max_bytes)
+
+        # Monotonic time before which a failed Word2Vec load is not retried
+        self._word_vectors_retry_at = 0
 
     def initialize_models(self):
-        """Initialize various NLP models"""
+        """Load the NLP models up front (they otherwise load on first use)"""
+        registry.warmup(['spacy', 'word2vec', 't5-base'])
+
+    @property
+    def nlp(self):
+        return registry.get('spacy')
+
+    @property
+    def word_vectors(self):
+        # Memory-mapped Word2Vec KeyedVectors (None until trained)
+        if not registry.is_loaded('word2vec') and time.monotonic() < self._word_vectors_retry_at:
+            return None
         try:
-            # Word2Vec model for word embeddings
-            self.word2vec = Word2Vec.load('models/word2vec/trained_model.w2v')
-        except:
-            print("Training new Word2Vec model...")
-            self.word2vec = None  # Will be trained on first use
+            return registry.get('word2vec')
+        except Exception as e:
+            # Not cached by the registry; retried after WORD2VEC_RETRY_INTERVAL
+            self._word_vectors_retry_at = time.monotonic() + WORD2VEC_RETRY_INTERVAL
+            print(f"Word2Vec load error: {str(e)}")
+            return None
 
     def load_nltk_resources(self):
         """Load required NLTK resources"""
@@ -47,37 +87,85 @@ class LanguageProcessor:
             except LookupError:
                 nltk.download(resource)
 
-    async def process_text(self, text, tasks=None):
+    async def process_text(self, text, tasks=None, options=None):
         """
         Comprehensive text processing
         tasks: list of tasks to perform (if None, perform all)
+        options: {'word_vectors': True} adds per-word vectors to semantics
         """
         if not tasks:
             tasks = ['syntax', 'semantics', 'sentiment', 'entities', 'summary']
+        include_word_vectors = bool((options or {}).get('word_vectors'))
 
-        # Cache check
-        cache_key = f"{text}_{'-'.join(tasks)}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
+        # Cache check, per task so results are reused across task lists
+        content_key = self.cache.content_key(text)
         results = {}
-        doc = self.nlp(text)
-
+        missing = []
         for task in tasks:
-            if task == 'syntax':
-                results['syntax'] = await self._analyze_syntax(doc)
-            elif task == 'semantics':
-                results['semantics'] = await self._analyze_semantics(text)
-            elif task == 'sentiment':
-                results['sentiment'] = await self._analyze_sentiment(text)
-            elif task == 'entities':
-                results['entities'] = await self._extract_entities(doc)
-            elif task == 'summary':
-                results['summary'] = await self._generate_summary(text)
+            cached = self.cache.get(content_key, self._cache_task(task, include_word_vectors))
+            if cached is None:
+                missing.append(task)
+            else:
+                results[task] = cached
+
+        # Parse once and share the Doc between tasks
+        doc = None
+        if DOC_TASKS.intersection(missing):
+            with metrics.span("nlp.parse"):
+                doc = await self.parse(text)
+
+        for task in missing:
+            with metrics.span(f"nlp.{task}"):
+                if task == 'syntax':
+                    results['syntax'] = await self._analyze_syntax(doc)
+                elif task == 'semantics':
+                    results['semantics'] = await self._analyze_semantics(text, include_word_vectors)
+                elif task == 'sentiment':
+                    results['sentiment'] = await self._analyze_sentiment(text, doc)
+                elif task == 'entities':
+                    results['entities'] = await self._extract_entities(doc)
+                elif task == 'summary':
+                    results['summary'] = await self._generate_summary(text)
 
         # Cache results
-        self.cache[cache_key] = results
-        return results
+        for task in missing:
+            if task in results:
+                self.cache.set(content_key, self._cache_task(task, include_word_vectors), results[task])
+
+        return {task: results[task] for task in tasks if task in results}
+
+    @staticmethod
+    def _cache_task(task, include_word_vectors):
+        # Semantics with per-word vectors is a different (much larger) result
+        if task == 'semantics' and include_word_vectors:
+            return 'semantics+word_vectors'
+        return task
+
+    def embed_text(self, text):
+        """Fixed-size text embedding: mean Word2Vec vector, or hashed term frequencies"""
+        if self.word_vectors is not None:
+            _, vectors = self._gather_word_vectors(re.findall(r'\w+', text.lower()))
+            return vectors.mean(axis=0) if vectors is not None else None
+        return self.hashing.transform([text]).toarray()[0]
+
+    def _gather_word_vectors(self, words):
+        """Look up all known words with one fancy-indexing gather"""
+        key_to_index = self.word_vectors.key_to_index
+        known = [word for word in words if word in key_to_index]
+        if not known:
+            return known, None
+        return known, self.word_vectors.vectors[[key_to_index[word] for word in known]]
+
+    async def process_texts(self, texts, tasks=None, options=None):
+        """Process several texts; their parses are batched through nlp.pipe"""
+        return await asyncio.gather(*(self.process_text(text, tasks, options) for text in texts))
+
+    async def parse(self, text):
+        """Parse text into a spaCy Doc, batched with concurrent callers"""
+        return await self.parser.submit(text)
+
+    def _parse_batch(self, texts):
+        return list(self.nlp.pipe(texts, batch_size=self.parse_batch_size))
 
     async def _analyze_syntax(self, doc):
         """Detailed syntactic analysis"""
@@ -96,31 +184,36 @@ class LanguageProcessor:
             'noun_phrases': [str(chunk) for chunk in doc.noun_chunks]
         }
 
-    async def _analyze_semantics(self, text):
-        """Semantic analysis including word embeddings"""
+    async def _analyze_semantics(self, text, include_word_vectors=False):
+        """Semantic analysis including a pooled sentence embedding"""
         blob = TextBlob(text)
         words = [word.lower() for word in blob.words if word.isalnum()]
         
         # Get word embeddings if available
+        sentence_vector = None
         embeddings = {}
-        if self.word2vec:
-            for word in words:
-                try:
-                    embeddings[word] = self.word2vec.wv[word].tolist()
-                except KeyError:
-                    continue
+        if self.word_vectors is not None:
+            known, vectors = self._gather_word_vectors(words)
+            if vectors is not None:
+                sentence_vector = vectors.mean(axis=0).tolist()
+                if include_word_vectors:
+                    embeddings = dict(zip(known, vectors.tolist()))
 
-        return {
+        semantics = {
             'language': blob.detect_language(),
-            'word_embeddings': embeddings,
+            'sentence_vector': sentence_vector,
             'key_phrases': self._extract_key_phrases(blob),
             'word_frequencies': blob.word_counts
         }
+        if include_word_vectors:
+            semantics['word_embeddings'] = embeddings
+        return semantics
 
-    async def _analyze_sentiment(self, text):
+    async def _analyze_sentiment(self, text, doc=None):
         """Multi-level sentiment analysis"""
         blob = TextBlob(text)
-        doc = self.nlp(text)
+        if doc is None:
+            doc = await self.parse(text)
         
         return {
             'overall': {
@@ -153,29 +246,9 @@ class LanguageProcessor:
     async def _generate_summary(self, text):
         """Generate text summary using T5"""
         try:
-            inputs = self.t5_tokenizer.encode(
-                "summarize: " + text,
-                return_tensors="pt",
-                max_length=512,
-                truncation=True
-            )
-            
-            summary_ids = self.t5_model.generate(
-                inputs,
-                max_length=150,
-                min_length=40,
-                length_penalty=2.0,
-                num_beams=4,
-                early_stopping=True
-            )
-            
-            summary = self.t5_tokenizer.decode(
-                summary_ids[0],
-                skip_special_tokens=True
-            )
-            
-            return summary
+            return await self.summarizer.summarize(text)
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(upstream="t5")
             print(f"Summary generation error: {str(e)}")
             return None
 
@@ -194,11 +267,16 @@ class LanguageProcessor:
         """Analyze conversation patterns and context"""
         try:
             full_text = " ".join([turn['text'] for turn in conversation_history])
-            doc = self.nlp(full_text)
+
+            # Parse each turn once; the full-text Doc is stitched from the turn Docs
+            turn_docs = await asyncio.gather(
+                *(self.parse(turn['text']) for turn in conversation_history)
+            )
+            doc = Doc.from_docs(turn_docs) if turn_docs else self.nlp.make_doc(full_text)
             
             return {
-                'topic_evolution': self._analyze_topic_evolution(conversation_history),
-                'overall_sentiment': await self._analyze_sentiment(full_text),
+                'topic_evolution': self._analyze_topic_evolution(conversation_history, turn_docs),
+                'overall_sentiment': await self._analyze_sentiment(full_text, doc),
                 'key_entities': await self._extract_entities(doc),
                 'conversation_summary': await self._generate_summary(full_text)
             }
@@ -206,11 +284,10 @@ class LanguageProcessor:
             print(f"Conversation analysis error: {str(e)}")
             return None
 
-    def _analyze_topic_evolution(self, conversation_history):
+    def _analyze_topic_evolution(self, conversation_history, turn_docs):
         """Track how topics evolve through the conversation"""
         topics = []
-        for turn in conversation_history:
-            doc = self.nlp(turn['text'])
+        for turn, doc in zip(conversation_history, turn_docs):
             topics.append({
                 'timestamp': turn['timestamp'],
                 'main_topics': [token.text for token in doc if token.pos_ in ['NOUN', 'PROPN']]
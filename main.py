@@ -1,17 +1,27 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException, WebSocket, Depends
+from fastapi import FastAPI, HTTPException, WebSocket, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from typing import List, Optional
 import asyncio
+import os
+import time
 import uvicorn
 from datetime import datetime
 import json
 
 from core.api_integration.api_orchestrator import APIOrchestrator
 from core.nlp.language_processor import LanguageProcessor
-from core.nlp.context_manager import ContextManager
+from core.nlp.session_store import SessionContextStore
+from core.nlp.session_backend import create_session_backend
 from core.database.mongodb_handler import MongoDBHandler
+from core.search.http_client import close_session
+from core.models.model_registry import registry as model_registry
+from core.monitoring import metrics
+from core.runtime.warmup import readiness, run_warmup, models_loaded
+from app.middleware.auth import AuthMiddleware
+from app.middleware.admission import AdmissionController
 
 app = FastAPI(title="Advanced AI System API")
 
@@ -27,8 +37,149 @@ app.add_middleware(
 # Security
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Initialize core components
-api_orchestrator = APIOrchestrator()
+# Snapshot of the retrieval index; workers resume from it at startup
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "data/conversation_index.npz")
+
+# Where session context lives: "memory" (per worker), "sqlite" (per host)
+# or "redis" (shared); SESSION_STORE_URL is the SQLite path or Redis URL
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL")
+
+# JWT signing key; without it every client is identified by its address
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# Per-subject rate limit in requests per second; unset means no limit.
+# Anonymous clients are keyed on their address, so behind a proxy list it
+# in TRUSTED_PROXIES (comma-separated) to use X-Forwarded-For instead
+RATE_LIMIT_PER_SECOND = os.getenv("RATE_LIMIT_PER_SECOND")
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST") or 10)
+TRUSTED_PROXIES = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+# Models loaded (and run once) before reporting ready; the rest load on first use
+MODEL_WARMUP = ['spacy', 'sentiment-analysis', 'ner', 'text-generation', 't5-base', 'word2vec']
+
+# Initialize core components (models are loaded lazily via the model registry)
 language_processor = LanguageProcessor()
-context_manager = ContextManager()
+api_orchestrator = APIOrchestrator(
+    embed=language_processor.embed_text,
+    index_path=VECTOR_INDEX_PATH
+)
+context_store = SessionContextStore(backend=create_session_backend(SESSION_BACKEND, SESSION_STORE_URL))
 db_handler = MongoDBHandler()
+
+# Rate limits and load shedding for /process and the WebSocket
+auth = AuthMiddleware(SECRET_KEY) if SECRET_KEY else None
+admission = AdmissionController(
+    auth=auth,
+    rate=float(RATE_LIMIT_PER_SECOND) if RATE_LIMIT_PER_SECOND else None,
+    burst=RATE_LIMIT_BURST,
+    trusted_proxies=TRUSTED_PROXIES
+)
+
+def collect_component_stats():
+    """Cache, queue and session gauges for /metrics, read at scrape time"""
+    caches = {
+        'search': api_orchestrator.search.cache,
+        'llm_response': api_orchestrator.openai.response_cache,
+        'nlp_results': language_processor.cache
+    }
+    for name, cache in caches.items():
+        if cache is None:
+            continue
+        stats = cache.get_stats()
+        for event in ('hits', 'stale_hits', 'misses', 'evictions'):
+            if event in stats:
+                yield ('ai_cache_events_total', 'Cache lookups and evictions', 'counter',
+                       {'cache': name, 'event': event}, stats[event])
+        yield ('ai_cache_entries', 'Entries held per cache', 'gauge',
+               {'cache': name}, stats.get('size', stats.get('entries', 0)))
+
+    queues = {
+        'mongo.conversations': api_orchestrator.db.conversation_writer.depth,
+        'mongo.learned_data': api_orchestrator.db.learning_writer.depth,
+        'spacy': language_processor.parser.queue_depth,
+        't5': language_processor.summarizer.batcher.queue_depth
+    }
+    for task, batcher in api_orchestrator.huggingface.batchers.items():
+        queues[f"hf.{task}"] = batcher.queue_depth
+    for name, depth in queues.items():
+        yield ('ai_queue_depth', 'Items waiting in internal queues', 'gauge', {'queue': name}, depth)
+
+    for state in ('active', 'waiting'):
+        yield ('ai_admission_requests', 'Admitted requests running or waiting for a slot', 'gauge',
+               {'state': state}, getattr(admission, state))
+
+    sessions = context_store.get_stats()
+    yield ('ai_sessions', 'Live conversation sessions', 'gauge', {}, sessions['sessions'])
+    yield ('ai_session_bytes', 'Approximate memory held by sessions', 'gauge', {}, sessions['bytes'])
+
+metrics.registry.register_collector(collect_component_stats)
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Collect per-request span timings; returned as Server-Timing when asked for"""
+    timings = metrics.start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    if request.headers.get("x-request-timing"):
+        timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+    return response
+
+# Seconds between warmup attempts while a model fails to load
+WARMUP_RETRY_INTERVAL = 30
+
+def preload_models():
+    """Load model weights only (no inference); used before forking workers"""
+    return model_registry.warmup(MODEL_WARMUP)
+
+def warmup():
+    """
+    Load models and run a warmup inference pass. The process is marked
+    ready only when every model in MODEL_WARMUP loaded.
+    """
+    timings = run_warmup(model_registry, MODEL_WARMUP, language_processor, api_orchestrator)
+    if models_loaded(timings):
+        readiness.mark_ready(timings)
+    else:
+        readiness.details = timings
+    return readiness.ready
+
+async def warmup_until_ready():
+    while not await asyncio.to_thread(warmup):
+        print(f"Warmup incomplete, retrying in {WARMUP_RETRY_INTERVAL}s")
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until warmup has finished"""
+    if not readiness.ready:
+        return JSONResponse({"status": "warming_up", "warmup": readiness.details}, status_code=503)
+    return {"status": "ready", "warmup": readiness.details}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# Routes (imported after the components they use exist)
+from app.routes import api, chat
+app.include_router(api.router)
+app.include_router(chat.router)
+
+@app.on_event("startup")
+async def startup_event():
+    context_store.start()
+    # Load (or back-fill) the retrieval index and keep it current
+    api_orchestrator.db.start_index_refresh()
+    # Warmup inference runs here, in each worker; with run.py's preloading
+    # the weights are already in memory and only the inference pass remains
+    asyncio.get_running_loop().create_task(warmup_until_ready())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release pooled upstream connections
+    await close_session()
+    await context_store.stop()
+    # Flush buffered database writes
+    await api_orchestrator.db.close()
+    await db_handler.close()
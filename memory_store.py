@@ -0,0 +1,95 @@
+# core/database/memory_store.py
+import asyncio
+import itertools
+import re
+
+class InMemoryCursor:
+    """Just enough of a Motor cursor for find().sort().limit().to_list()"""
+
+    def __init__(self, documents, query=None):
+        self.documents = documents
+        self.query = query
+        self._limit = None
+        self._sort = None
+
+    def sort(self, key, direction=1):
+        # Only single-field sorts; $text score sorts are handled by the query
+        if isinstance(key, str):
+            self._sort = (key, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    async def to_list(self, length=None):
+        documents = self.documents
+        if self.query:
+            # Crude stand-in for $text scoring: count shared terms
+            terms = set(re.findall(r'\w+', self.query.lower()))
+            scored = []
+            for document in documents:
+                text = str(document.get('user_input', '')).lower()
+                score = len(terms & set(re.findall(r'\w+', text)))
+                if score:
+                    scored.append((score, document))
+            scored.sort(key=lambda item: item[0], reverse=True)
+            documents = [document for _, document in scored]
+        if self._sort is not None:
+            key, direction = self._sort
+            documents = sorted(
+                (document for document in documents if document.get(key) is not None),
+                key=lambda document: document[key],
+                reverse=direction < 0
+            )
+        limit = min(filter(None, [self._limit, length]), default=None)
+        return list(documents[:limit] if limit else documents)
+
+class InMemoryCollection:
+    """Async in-memory stand-in for a Motor collection, for tests and benchmarks"""
+
+    def __init__(self, write_latency=0.0):
+        self.documents = []
+        self.write_latency = write_latency
+        self._ids = itertools.count(1)
+
+    async def insert_one(self, document):
+        return await self.insert_many([document])
+
+    async def insert_many(self, documents, ordered=True):
+        if self.write_latency:
+            await asyncio.sleep(self.write_latency)
+        # Like the driver, assign _id in place
+        for document in documents:
+            document.setdefault('_id', next(self._ids))
+        self.documents.extend(documents)
+
+    def find(self, filter=None, projection=None):
+        filter = filter or {}
+        query = filter.get('$text', {}).get('$search')
+        documents = self.documents
+        # Supports {field: {'$gte': value}} besides $text
+        for field, condition in filter.items():
+            if isinstance(condition, dict) and '$gte' in condition:
+                documents = [
+                    document for document in documents
+                    if document.get(field) is not None and document[field] >= condition['$gte']
+                ]
+        return InMemoryCursor(documents, query)
+
+class InMemoryDatabase:
+    """Collections are created on first access, like a Mongo database"""
+
+    def __init__(self, write_latency=0.0):
+        self.write_latency = write_latency
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(self.write_latency)
+        return self._collections[name]
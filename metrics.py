@@ -0,0 +1,198 @@
+# core/monitoring/metrics.py
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request timing breakdown: span name -> milliseconds
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 3)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        for key, state in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, {'le': le}), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), state[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), state[-1]
+
+class MetricsRegistry:
+    """Holds metrics and collector callbacks and renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collect):
+        """
+        collect() is called on every scrape and returns
+        (name, help, type, labels dict, value) tuples, e.g. cache stats
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+
+        collected = {}
+        for collect in self._collectors:
+            try:
+                for name, help, metric_type, labels, value in collect():
+                    entry = collected.setdefault(name, (help, metric_type, []))
+                    entry[2].append((labels, value))
+            except Exception as e:
+                print(f"Metrics collector error: {str(e)}")
+        for name, (help, metric_type, samples) in collected.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class LatencyEstimator:
+    """Exponentially weighted moving average of each span's latency (seconds)"""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._estimates = {}
+
+    def update(self, name, seconds):
+        previous = self._estimates.get(name)
+        if previous is None:
+            self._estimates[name] = seconds
+        else:
+            self._estimates[name] = previous + self.alpha * (seconds - previous)
+
+    def get(self, name, default=None):
+        return self._estimates.get(name, default)
+
+registry = MetricsRegistry()
+latency_estimates = LatencyEstimator()
+
+STAGE_LATENCY = registry.histogram(
+    'ai_stage_latency_seconds', 'Latency of pipeline stages and model calls', ['stage'])
+STAGE_OUTCOMES = registry.counter(
+    'ai_stage_outcomes_total', 'Pipeline stage results by status', ['stage', 'status'])
+UPSTREAM_ERRORS = registry.counter(
+    'ai_upstream_errors_total', 'Errors from upstream services and models', ['upstream'])
+COALESCED_REQUESTS = registry.counter(
+    'ai_coalesced_requests_total', 'Requests that joined an identical in-flight call', ['group'])
+ADMISSION_REJECTED = registry.counter(
+    'ai_admission_rejected_total', 'Requests refused by admission control', ['reason'])
+BATCH_SIZE = registry.histogram(
+    'ai_batch_size', 'Items per batched model call', ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+
+def observe(name, seconds):
+    """Record a span duration in the histogram and the current request's breakdown"""
+    STAGE_LATENCY.observe(seconds, stage=name)
+    latency_estimates.update(name, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0.0) + seconds * 1000, 2)
+
+@contextmanager
+def span(name):
+    """Time a block of code (sync or inside a coroutine)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def start_request_timings():
+    """Begin collecting a timing breakdown for the current request context"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def server_timing_header(timings):
+    """Format a breakdown as a Server-Timing header value"""
+    return ", ".join(
+        f"{name.replace(' ', '_')};dur={duration}" for name, duration in timings.items()
+    )
@@ -0,0 +1,158 @@
+# core/models/model_registry.py
+import os
+import tempfile
+import threading
+import time
+
+WORD2VEC_MODEL_PATH = 'models/word2vec/trained_model.w2v'
+WORD2VEC_VECTORS_PATH = 'models/word2vec/trained_model.kv'
+
+class ModelRegistry:
+    """
+    Process-wide registry of lazily loaded models.
+    Each model is loaded once, on first use (or explicit warmup), and the
+    same instance is shared by every consumer in the process.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, replace=False):
+        """Register a zero-argument loader under a name"""
+        with self._lock:
+            if name in self._loaders and not replace:
+                raise ValueError(f"Model already registered: {name}")
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            if replace:
+                self._models.pop(name, None)
+
+    def get(self, name):
+        """Return the shared instance, loading it on first use"""
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name] = self._loaders[name]()
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def loaded(self):
+        return list(self._models)
+
+    def warmup(self, names=None):
+        """Load the given models (all registered ones by default), returning load times"""
+        timings = {}
+        for name in names if names is not None else list(self._loaders):
+            start = time.perf_counter()
+            try:
+                self.get(name)
+                timings[name] = round(time.perf_counter() - start, 3)
+            except Exception as e:
+                print(f"Model warmup error ({name}): {str(e)}")
+                timings[name] = None
+        return timings
+
+    def unload(self, name):
+        self._models.pop(name, None)
+
+
+def _load_text_generation():
+    from transformers import pipeline
+    import torch
+    generator = pipeline(
+        "text-generation",
+        model="gpt2",
+        device=0 if torch.cuda.is_available() else -1
+    )
+    # gpt2 has no pad token; batched generation needs left padding
+    generator.tokenizer.pad_token = generator.tokenizer.eos_token
+    generator.tokenizer.padding_side = "left"
+    return generator
+
+def _load_sentiment():
+    from transformers import pipeline
+    # Same checkpoint as the default sentiment-analysis pipeline
+    return pipeline(
+        "text-classification",
+        model="distilbert-base-uncased-finetuned-sst-2-english"
+    )
+
+def _load_ner():
+    from transformers import pipeline
+    return pipeline("ner", aggregation_strategy="simple")
+
+def _load_question_answering():
+    from transformers import pipeline
+    return pipeline("question-answering")
+
+def _load_summarization():
+    from transformers import pipeline
+    return pipeline("summarization")
+
+def _load_t5():
+    from transformers import T5Tokenizer, T5ForConditionalGeneration
+    return (
+        T5Tokenizer.from_pretrained('t5-base'),
+        T5ForConditionalGeneration.from_pretrained('t5-base')
+    )
+
+def _load_spacy():
+    import spacy
+    return spacy.load('en_core_web_trf')  # Using transformer pipeline
+
+def _export_word2vec_vectors():
+    """
+    One-time export of the trained vectors (.kv plus a separate .npy) under
+    a unique temp name, renamed into place so no process can load a
+    half-written file. The .kv file is renamed last, since its existence
+    marks the export as done.
+    """
+    from gensim.models import Word2Vec
+    directory = os.path.dirname(WORD2VEC_VECTORS_PATH) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.kv.tmp')
+    os.close(fd)
+    try:
+        Word2Vec.load(WORD2VEC_MODEL_PATH).wv.save(tmp_path, separately=['vectors'])
+        os.replace(f"{tmp_path}.vectors.npy", f"{WORD2VEC_VECTORS_PATH}.vectors.npy")
+        os.replace(tmp_path, WORD2VEC_VECTORS_PATH)
+    finally:
+        for leftover in (tmp_path, f"{tmp_path}.vectors.npy"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+def _load_word2vec():
+    from gensim.models import KeyedVectors
+    if not os.path.exists(WORD2VEC_VECTORS_PATH):
+        if not os.path.exists(WORD2VEC_MODEL_PATH):
+            return None  # Not trained yet
+        _export_word2vec_vectors()
+    # Memory-mapped read-only, so forked workers share one copy of the pages.
+    # Errors propagate, so a failed load is retried rather than cached.
+    return KeyedVectors.load(WORD2VEC_VECTORS_PATH, mmap='r')
+
+
+registry = ModelRegistry()
+registry.register('text-generation', _load_text_generation)
+registry.register('sentiment-analysis', _load_sentiment)
+# Separate instance (and tokenizer) for the KnowledgeBase trainer thread: fast
+# tokenizers are not safe to share with the request-path batcher
+registry.register('sentiment-analysis-trainer', _load_sentiment)
+registry.register('ner', _load_ner)
+registry.register('question-answering', _load_question_answering)
+registry.register('summarization', _load_summarization)
+registry.register('t5-base', _load_t5)
+registry.register('spacy', _load_spacy)
+registry.register('word2vec', _load_word2vec)
@@ -2,64 +2,133 @@
 import openai
 from core.config import Config
 import asyncio
+import hashlib
 import json
+from .prompt_builder import PromptBuilder
+from .response_cache import SemanticResponseCache
+from core.monitoring import metrics
+
+SYSTEM_PROMPT = "You are an advanced AI assistant with access to multiple AI services and real-time information."
 
 class OpenAIHandler:
-    def __init__(self):
+    def __init__(self, max_prompt_tokens=3000, embed=None, cache_threshold=0.98,
+                 cache_size=2048, cache_ttl=3600):
         openai.api_key = Config.OPENAI_API_KEY
-        self.conversation_history = []
+        # Conversation history is per session and passed in by the caller
+        # (SessionContextStore records each exchange)
         self.model = "gpt-3.5-turbo"  # or "gpt-4" if you have access
+        self.prompt_builder = PromptBuilder(self.model, max_prompt_tokens=max_prompt_tokens)
+
+        # Semantic response cache, enabled when an embedding function is given
+        self.response_cache = SemanticResponseCache(
+            embed,
+            threshold=cache_threshold,
+            max_entries=cache_size,
+            ttl=cache_ttl
+        ) if embed else None
 
-    async def generate_response(self, user_input, context=None):
+    async def generate_response(self, user_input, context=None, use_cache=True, history=None):
+        """history: the session's earlier turns, [{'user': ..., 'assistant': ...}]"""
         try:
+            cached, cache_key = await self._cache_lookup(user_input, use_cache, history)
+            if cached is not None:
+                return {**cached, 'cached': True}
+
             # Prepare conversation history
-            messages = self._prepare_messages(user_input, context)
-            
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=messages,
-                temperature=Config.TEMPERATURE,
-                max_tokens=Config.MAX_TOKENS,
-                presence_penalty=0.6,
-                frequency_penalty=0.0
-            )
+            messages, prompt_tokens = self._prepare_messages(user_input, context, history)
             
-            # Store conversation
-            self._update_conversation_history(user_input, response.choices[0].message['content'])
+            with metrics.span("upstream.openai"):
+                response = await openai.ChatCompletion.acreate(
+                    model=self.model,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    max_tokens=Config.MAX_TOKENS,
+                    presence_penalty=0.6,
+                    frequency_penalty=0.0
+                )
             
-            return {
+            result = {
                 'response': response.choices[0].message['content'],
                 'usage': response.usage,
+                'prompt_tokens': prompt_tokens,
                 'model': self.model
             }
+            self._cache_store(cache_key, result)
+            return result
             
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(upstream="openai")
             print(f"OpenAI API error: {str(e)}")
             return None
 
-    def _prepare_messages(self, user_input, context):
-        messages = [
-            {"role": "system", "content": "You are an advanced AI assistant with access to multiple AI services and real-time information."}
-        ]
-        
-        # Add context if available
-        if context:
-            messages.append({"role": "system", "content": f"Context: {json.dumps(context)}"})
-        
-        # Add conversation history
-        for conv in self.conversation_history[-5:]:  # Last 5 conversations
-            messages.append({"role": "user", "content": conv["user"]})
-            messages.append({"role": "assistant", "content": conv["assistant"]})
-            
-        # Add current input
-        messages.append({"role": "user", "content": user_input})
-        
-        return messages
+    async def stream_response(self, user_input, context=None, prompt_stats=None, use_cache=True,
+                              history=None):
+        """Yield response tokens as they arrive from the API"""
+        cached, cache_key = await self._cache_lookup(user_input, use_cache, history)
+        if cached is not None:
+            yield cached['response']
+            return
+
+        messages, prompt_tokens = self._prepare_messages(user_input, context, history)
+        if prompt_stats is not None:
+            prompt_stats.update(prompt_tokens)
+
+        response = await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            temperature=Config.TEMPERATURE,
+            max_tokens=Config.MAX_TOKENS,
+            presence_penalty=0.6,
+            frequency_penalty=0.0,
+            stream=True
+        )
 
-    def _update_conversation_history(self, user_input, response):
-        self.conversation_history.append({
-            "user": user_input,
-            "assistant": response
+        parts = []
+        async for chunk in response:
+            delta = chunk.choices[0].delta.get('content')
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        self._cache_store(cache_key, {
+            'response': ''.join(parts),
+            'usage': None,
+            'prompt_tokens': prompt_tokens,
+            'model': self.model
         })
-        if len(self.conversation_history) > 20:  # Keep last 20 conversations
-            self.conversation_history.pop(0)
+
+    async def _cache_lookup(self, user_input, use_cache, history=None):
+        """Return (cached response or None, cache key)"""
+        if self.response_cache is None or not use_cache:
+            return None, None
+        try:
+            return await self.response_cache.lookup(user_input, scope=self._cache_scope(history))
+        except Exception as e:
+            print(f"Response cache error: {str(e)}")
+            return None, None
+
+    def _cache_store(self, cache_key, result):
+        if self.response_cache is not None:
+            self.response_cache.store(cache_key, result)
+
+    def _cache_scope(self, history):
+        """
+        Digest of everything besides the prompt text that shapes the answer:
+        the history turns that go into the prompt and the generation settings.
+        A follow-up like "why?" only hits answers given after the same turns.
+        """
+        turns = (history or [])[-self.prompt_builder.max_history_turns:]
+        scope = json.dumps([
+            self.model, SYSTEM_PROMPT, Config.TEMPERATURE, Config.MAX_TOKENS,
+            [[turn['user'], turn['assistant']] for turn in turns]
+        ])
+        return hashlib.blake2b(scope.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _prepare_messages(self, user_input, context, history=None):
+        """Build the prompt within the token budget, returning (messages, token breakdown)"""
+        return self.prompt_builder.build(
+            SYSTEM_PROMPT,
+            user_input,
+            context=context,
+            history=history
+        )
@@ -0,0 +1,43 @@
+# core/utils/projection.py
+
+ANALYSIS_TASKS = ['syntax', 'semantics', 'sentiment', 'entities', 'summary']
+
+def analysis_tasks(fields, prefix):
+    """
+    Which analysis tasks a field selection needs.
+    Returns None when every task is needed, [] when none are.
+    """
+    if fields is None:
+        return None
+    tasks = []
+    for field in fields:
+        parts = field.split('.')
+        if parts[0] != prefix:
+            continue
+        if len(parts) == 1:
+            return None
+        if parts[1] in ANALYSIS_TASKS and parts[1] not in tasks:
+            tasks.append(parts[1])
+    return tasks
+
+def project(payload, fields, always=('status',)):
+    """Keep only the dotted field paths in `fields` (plus `always`)"""
+    if fields is None:
+        return payload
+
+    projected = {key: payload[key] for key in always if key in payload}
+    for field in fields:
+        source, target = payload, projected
+        parts = field.split('.')
+        for i, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                break
+            if i == len(parts) - 1:
+                target[part] = source[part]
+            else:
+                source = source[part]
+                existing = target.get(part)
+                if not isinstance(existing, dict):
+                    existing = target[part] = {}
+                target = existing
+    return projected
@@ -0,0 +1,167 @@
+# core/api_integration/prompt_builder.py
+import re
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a character-based estimate
+    tiktoken = None
+
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD = 4
+
+class TokenCounter:
+    """Counts tokens locally with tiktoken, or estimates ~4 characters per token"""
+
+    def __init__(self, model):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(text) // 4 + 1
+
+    def truncate(self, text, max_tokens):
+        """Cut text down to at most max_tokens"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens]) + "..."
+        return text[:max_tokens * 4] + "..."
+
+class PromptBuilder:
+    """
+    Assembles chat messages within a token budget.
+    Context items are ranked by relevance to the user input and added until
+    the context budget is spent; history is added newest first, keeping the
+    most recent turns intact and compressing or dropping older ones.
+    """
+
+    def __init__(self, model, max_prompt_tokens=3000, max_context_tokens=1500,
+                 max_item_tokens=200, max_history_turns=5, full_history_turns=2,
+                 compressed_turn_tokens=60):
+        self.counter = TokenCounter(model)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_context_tokens = max_context_tokens
+        self.max_item_tokens = max_item_tokens
+        self.max_history_turns = max_history_turns
+        self.full_history_turns = full_history_turns
+        self.compressed_turn_tokens = compressed_turn_tokens
+
+    def build(self, system_prompt, user_input, context=None, history=None):
+        """Return (messages, token breakdown)"""
+        count = self.counter.count
+        system_tokens = count(system_prompt) + MESSAGE_OVERHEAD
+        user_tokens = count(user_input) + MESSAGE_OVERHEAD
+        remaining = self.max_prompt_tokens - system_tokens - user_tokens
+
+        context_message, context_tokens, items_used, items_dropped = self._build_context(
+            user_input, context, min(self.max_context_tokens, remaining)
+        )
+        remaining -= context_tokens
+
+        history_messages, history_tokens, turn_counts = self._build_history(history or [], remaining)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if context_message:
+            messages.append({"role": "system", "content": context_message})
+        messages.extend(history_messages)
+        messages.append({"role": "user", "content": user_input})
+
+        breakdown = {
+            'budget': self.max_prompt_tokens,
+            'system': system_tokens,
+            'context': context_tokens,
+            'history': history_tokens,
+            'user': user_tokens,
+            'total': system_tokens + context_tokens + history_tokens + user_tokens,
+            'context_items_used': items_used,
+            'context_items_dropped': items_dropped,
+            **turn_counts
+        }
+        return messages, breakdown
+
+    def _build_context(self, user_input, context, budget):
+        items = self._context_items(context)
+        if not items or budget <= MESSAGE_OVERHEAD:
+            return None, 0, 0, len(items)
+
+        query_terms = self._terms(user_input)
+        ranked = sorted(items, key=lambda item: self._relevance(query_terms, item[1]), reverse=True)
+
+        lines = []
+        used_tokens = MESSAGE_OVERHEAD + self.counter.count("Context:")
+        for source, text in ranked:
+            line = f"- [{source}] {self.counter.truncate(text, self.max_item_tokens)}"
+            line_tokens = self.counter.count(line)
+            if used_tokens + line_tokens > budget:
+                continue
+            lines.append(line)
+            used_tokens += line_tokens
+
+        if not lines:
+            return None, 0, 0, len(items)
+        return "Context:\n" + "\n".join(lines), used_tokens, len(lines), len(items) - len(lines)
+
+    def _build_history(self, history, budget):
+        turns = history[-self.max_history_turns:] if self.max_history_turns else []
+        selected = []
+        used_tokens = 0
+        counts = {'turns_full': 0, 'turns_compressed': 0, 'turns_dropped': len(history) - len(turns)}
+
+        # Walk newest to oldest; the newest turns are kept whole
+        for age, conv in enumerate(reversed(turns)):
+            user_text, assistant_text = conv["user"], conv["assistant"] or ""
+            if age >= self.full_history_turns:
+                user_text = self.counter.truncate(user_text, self.compressed_turn_tokens)
+                assistant_text = self.counter.truncate(assistant_text, self.compressed_turn_tokens)
+            turn_tokens = self.counter.count(user_text) + self.counter.count(assistant_text) + 2 * MESSAGE_OVERHEAD
+
+            if used_tokens + turn_tokens > budget:
+                counts['turns_dropped'] += len(turns) - age
+                break
+
+            selected.append((user_text, assistant_text))
+            used_tokens += turn_tokens
+            counts['turns_full' if age < self.full_history_turns else 'turns_compressed'] += 1
+
+        messages = []
+        for user_text, assistant_text in reversed(selected):
+            messages.append({"role": "user", "content": user_text})
+            messages.append({"role": "assistant", "content": assistant_text})
+        return messages, used_tokens, counts
+
+    @staticmethod
+    def _context_items(context):
+        """Flatten orchestrator context into (source, text) items"""
+        if not context:
+            return []
+        items = []
+        for result in context.get('search_results') or []:
+            text = " ".join(filter(None, [result.get('title'), result.get('snippet'), result.get('link')]))
+            if text:
+                items.append((result.get('source') or 'search', text))
+        for doc in context.get('database_context') or []:
+            response = doc.get('response')
+            if isinstance(response, dict):
+                response = response.get('response')
+            text = " ".join(filter(None, [doc.get('user_input'), response]))
+            if text:
+                items.append(('history', text))
+        return items
+
+    @staticmethod
+    def _terms(text):
+        return set(re.findall(r'\w+', text.lower()))
+
+    def _relevance(self, query_terms, text):
+        terms = self._terms(text)
+        if not terms or not query_terms:
+            return 0.0
+        return len(query_terms & terms) / (len(terms) ** 0.5)
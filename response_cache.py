@@ -0,0 +1,159 @@
+# core/api_integration/response_cache.py
+import asyncio
+import re
+import time
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# Words that change what is being asked; sklearn's stopword list includes
+# them, but they are never dropped and near-duplicates must agree on them
+SIGNIFICANT_WORDS = frozenset({
+    'not', 'no', 'nor', 'never', 'none', 'nothing', 'neither', 'without', 'cannot',
+    'before', 'after', 'more', 'less', 'most', 'least', 'few', 'fewer',
+    'above', 'below', 'over', 'under', 'up', 'down', 'first', 'last',
+    'one', 'two', 'three', 'four', 'five', 'six', 'eight', 'nine', 'ten',
+    'eleven', 'twelve', 'fifteen', 'twenty', 'forty', 'fifty', 'sixty', 'hundred'
+})
+EMBEDDING_STOP_WORDS = ENGLISH_STOP_WORDS - SIGNIFICANT_WORDS
+OPERATORS = frozenset('+-*/%^=<>')
+
+def normalize_prompt(text):
+    """Exact-match key: lowercased, whitespace collapsed, nothing else removed"""
+    return ' '.join(text.lower().split())
+
+def _tokens(text):
+    return re.findall(r'\w+|[^\w\s]', text.lower().replace("n't", " not"))
+
+def content_words(text):
+    """Embedding input: stopwords and punctuation dropped, significant words and operators kept"""
+    return ' '.join(
+        token for token in _tokens(text)
+        if token in OPERATORS or (re.match(r'\w', token) and token not in EMBEDDING_STOP_WORDS)
+    )
+
+def significant_terms(text):
+    """Negations, comparisons, numbers and operators, in order"""
+    return tuple(
+        token for token in _tokens(text)
+        if token in SIGNIFICANT_WORDS or token in OPERATORS or any(c.isdigit() for c in token)
+    )
+
+class SemanticResponseCache:
+    """
+    Cache of LLM responses, partitioned by scope (a digest of everything
+    else that shapes the answer: conversation history, model, options).
+    Within a scope, a prompt hits on an exact match of its lowercased,
+    whitespace-collapsed text, or on a near-duplicate whose content-word
+    embedding has cosine similarity of at least `threshold` and which has
+    the same negations, numbers and operators. Embeddings live in one
+    preallocated matrix, so the near-duplicate check is a single
+    matrix-vector product over the live rows.
+    """
+
+    def __init__(self, embed, threshold=0.98, max_entries=2048, ttl=3600):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors = None  # allocated on first store, once the dimension is known
+        self._expires = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._values = [None] * max_entries
+        self._keys = [None] * max_entries
+        # Hash of each row's scope and significant terms, so the
+        # near-duplicate search stays vectorized
+        self._partitions = np.zeros(max_entries, dtype=np.int64)
+        # (scope, normalized prompt) -> slot
+        self._exact = {}
+        self.stats = {'hits': 0, 'exact_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    async def lookup(self, text, scope=''):
+        """Return (cached value or None, cache key to pass to store())"""
+        normalized = normalize_prompt(text)
+        partition = hash((scope, significant_terms(text)))
+        now = time.monotonic()
+        slot = self._exact.get((scope, normalized))
+        if slot is not None and self._expires[slot] > now:
+            self.stats['hits'] += 1
+            self.stats['exact_hits'] += 1
+            self._last_used[slot] = now
+            return self._values[slot], (scope, normalized, partition, None)
+
+        words = content_words(text)
+        embedding = await asyncio.to_thread(self._embed, words) if words else None
+        key = (scope, normalized, partition, embedding)
+        slot = self._nearest(embedding, partition) if embedding is not None else None
+        if slot is None:
+            self.stats['misses'] += 1
+            return None, key
+
+        self.stats['hits'] += 1
+        self._last_used[slot] = time.monotonic()
+        return self._values[slot], key
+
+    def store(self, key, value):
+        """Store a value under a key returned by lookup()"""
+        if key is None or value is None:
+            return
+        scope, normalized, partition, embedding = key
+        if embedding is None or not normalized:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+        elif embedding.shape[0] != self._vectors.shape[1]:
+            return
+
+        now = time.monotonic()
+        free = np.flatnonzero(self._expires <= now)
+        if free.size:
+            slot = free[0]
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.stats['evictions'] += 1
+
+        previous = self._keys[slot]
+        if previous is not None and self._exact.get(previous) == slot:
+            del self._exact[previous]
+        self._keys[slot] = (scope, normalized)
+        self._exact[(scope, normalized)] = slot
+        self._partitions[slot] = partition
+        self._vectors[slot] = embedding
+        self._values[slot] = value
+        self._expires[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self.stats['stores'] += 1
+
+    def _embed(self, text):
+        vector = self.embed(text)
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _nearest(self, embedding, partition):
+        if self._vectors is None or embedding.shape[0] != self._vectors.shape[1]:
+            return None
+        live = (self._expires > time.monotonic()) & (self._partitions == partition)
+        if not live.any():
+            return None
+
+        similarities = self._vectors @ embedding
+        similarities[~live] = -np.inf
+        slot = int(np.argmax(similarities))
+        return slot if similarities[slot] >= self.threshold else None
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': int((self._expires > time.monotonic()).sum()),
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self._expires[:] = 0
+        self._values = [None] * self.max_entries
+        self._keys = [None] * self.max_entries
+        self._partitions[:] = 0
+        self._exact = {}
@@ -0,0 +1,86 @@
+# core/nlp/result_cache.py
+import hashlib
+import sys
+from collections import OrderedDict
+
+def approximate_size(obj):
+    """Rough deep size in bytes of a JSON-like result"""
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        nbytes = getattr(item, 'nbytes', None)
+        if nbytes is not None:
+            # numpy arrays and similar buffers
+            size += nbytes
+            continue
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+    return size
+
+class TaskResultCache:
+    """
+    LRU cache of per-task analysis results keyed by a hash of the text.
+    Eviction is driven by the approximate byte size of the stored results.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        # (content hash, task) -> (result, size)
+        self._entries = OrderedDict()
+        self.current_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0}
+
+    @staticmethod
+    def content_key(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get(self, content_key, task):
+        """Return the cached result for a task, or None"""
+        key = (content_key, task)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, content_key, task, result):
+        # None means the task failed; let it be retried
+        if result is None:
+            return
+        size = approximate_size(result)
+        if size > self.max_entry_bytes:
+            self.stats['rejected'] += 1
+            return
+
+        key = (content_key, task)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous[1]
+        self._entries[key] = (result, size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.stats['evictions'] += 1
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
@@ -1,12 +1,80 @@
 # run.py
+import argparse
+import gc
+import os
 import uvicorn
-from app.main import app
+
+def run_development(host, port):
+    """Single auto-reloading worker"""
+    uvicorn.run("app.main:app", host=host, port=port, reload=True)
+
+def cuda_available():
+    """GPU check that does not initialize CUDA, so it is safe before forking"""
+    os.environ.setdefault('PYTORCH_NVML_BASED_CUDA_CHECK', '1')
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+def run_production(host, port, workers, cpu_preload=False):
+    """
+    Load every model's weights once in this process, then fork the workers.
+    The workers share the model pages copy-on-write instead of each
+    loading their own copy, and each runs its own warmup inference pass
+    before reporting ready. Nothing runs inference before the fork: torch
+    thread pools and CUDA contexts do not survive it.
+
+    A CUDA context created in the parent is unusable in forked children,
+    so on GPU hosts nothing is preloaded and each worker loads its models
+    onto the GPU itself, unless cpu_preload trades the GPU for shared
+    CPU-resident weights.
+    """
+    preload = cpu_preload or not cuda_available()
+    if preload:
+        os.environ['CUDA_VISIBLE_DEVICES'] = ''
+
+    from gunicorn.app.base import BaseApplication
+    from app.main import app, preload_models
+
+    class PreloadedApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    if preload:
+        preload_models()
+        # Move everything loaded so far out of the GC's reach; otherwise the
+        # collector touches those objects in each worker and un-shares their pages
+        gc.freeze()
+
+    PreloadedApplication(app, {
+        'bind': f"{host}:{port}",
+        'workers': workers,
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'preload_app': True,
+        'timeout': 120
+    }).run()
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        workers=4
-    )
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--reload', action='store_true', help="development mode: one auto-reloading worker")
+    parser.add_argument('--cpu-preload', action='store_true',
+                        help="preload models before forking even on GPU hosts; workers then run on CPU")
+    args = parser.parse_args()
+
+    if args.reload:
+        run_development(args.host, args.port)
+    else:
+        run_production(args.host, args.port, args.workers, cpu_preload=args.cpu_preload)
@@ -1,43 +1,129 @@
 # core/search/google_search.py
-import requests
-from serpapi import GoogleSearch
+import asyncio
 from core.config import Config
+from .http_client import get_json
+from .search_cache import SearchResultCache
+from core.monitoring import metrics
+
+SERPAPI_SEARCH_URL = "https://serpapi.com/search.json"
 
 class GoogleSearchEngine:
-    def __init__(self):
+    def __init__(self, hedged=False, hedge_delay=0.3, request_timeout=5,
+                 google_url=None, serpapi_url=None,
+                 cache_size=1024, cache_ttl=300, cache_stale_ttl=3600):
         self.api_key = Config.GOOGLE_API_KEY
         self.cse_id = Config.GOOGLE_CSE_ID
         self.serpapi_key = Config.SERPAPI_API_KEY
+        self.google_url = google_url or Config.GOOGLE_SEARCH_URL
+        self.serpapi_url = serpapi_url or SERPAPI_SEARCH_URL
+        self.request_timeout = request_timeout
+        # Hedged mode: only call SerpAPI if Google is slower than hedge_delay
+        self.hedged = hedged
+        self.hedge_delay = hedge_delay
+        # Set cache_size=0 to disable result caching
+        self.cache = SearchResultCache(
+            max_entries=cache_size,
+            ttl=cache_ttl,
+            stale_ttl=cache_stale_ttl
+        ) if cache_size else None
 
     async def search(self, query, num_results=5):
+        if self.cache is None:
+            return await self._search_uncached(query, num_results)
+        return await self.cache.get_or_fetch(
+            query,
+            num_results,
+            lambda: self._search_uncached(query, num_results)
+        )
+
+    async def _search_uncached(self, query, num_results):
         try:
-            # Using official Google API
-            params = {
-                'key': self.api_key,
-                'cx': self.cse_id,
-                'q': query,
-                'num': num_results
-            }
-            response = requests.get(Config.GOOGLE_SEARCH_URL, params=params)
-            results = response.json()
-            
-            # Using SerpAPI as backup
-            serpapi_params = {
-                "api_key": self.serpapi_key,
-                "engine": "google",
-                "q": query,
-                "num": num_results
-            }
-            serpapi_results = GoogleSearch(serpapi_params).get_dict()
-            
+            if self.hedged:
+                return await self._hedged_search(query, num_results)
+
+            # Query both providers concurrently
+            results, serpapi_results = await asyncio.gather(
+                self._google_search(query, num_results),
+                self._serpapi_search(query, num_results),
+                return_exceptions=True
+            )
+            if isinstance(results, Exception):
+                metrics.UPSTREAM_ERRORS.inc(upstream="google")
+                print(f"Google API search error: {str(results)}")
+                results = {}
+            if isinstance(serpapi_results, Exception):
+                metrics.UPSTREAM_ERRORS.inc(upstream="serpapi")
+                print(f"SerpAPI search error: {str(serpapi_results)}")
+                serpapi_results = {}
+
             # Combine and process results
             combined_results = self._process_results(results, serpapi_results)
             return combined_results
-            
+
         except Exception as e:
             print(f"Search error: {str(e)}")
             return []
 
+    async def _google_search(self, query, num_results):
+        """Using official Google API"""
+        params = {
+            'key': self.api_key,
+            'cx': self.cse_id,
+            'q': query,
+            'num': num_results
+        }
+        with metrics.span("upstream.google"):
+            return await get_json(self.google_url, params=params, timeout=self.request_timeout)
+
+    async def _serpapi_search(self, query, num_results):
+        """Using SerpAPI as backup"""
+        serpapi_params = {
+            "api_key": self.serpapi_key,
+            "engine": "google",
+            "q": query,
+            "num": num_results
+        }
+        with metrics.span("upstream.serpapi"):
+            return await get_json(self.serpapi_url, params=serpapi_params, timeout=self.request_timeout)
+
+    async def _hedged_search(self, query, num_results):
+        """Start with Google, hedge with SerpAPI after hedge_delay, take the first answer"""
+        primary = asyncio.ensure_future(self._google_search(query, num_results))
+        sources = {primary: 'google'}
+        pending = {primary}
+        backup_started = False
+
+        try:
+            while pending:
+                timeout = None if backup_started else self.hedge_delay
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if task.exception() is not None:
+                        metrics.UPSTREAM_ERRORS.inc(upstream=sources[task])
+                        print(f"Hedged search error ({sources[task]}): {str(task.exception())}")
+                        continue
+                    if sources[task] == 'google':
+                        return self._process_results(task.result(), {})
+                    return self._process_results({}, task.result())
+
+                # Primary is slow or failed: fire the backup request
+                if not backup_started:
+                    backup = asyncio.ensure_future(self._serpapi_search(query, num_results))
+                    sources[backup] = 'serpapi'
+                    pending.add(backup)
+                    backup_started = True
+
+            return []
+        finally:
+            for task in sources:
+                if not task.done():
+                    task.cancel()
+
     def _process_results(self, google_results, serpapi_results):
         processed = []
         
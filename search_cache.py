@@ -0,0 +1,100 @@
+# core/search/search_cache.py
+import asyncio
+import re
+import time
+from collections import OrderedDict
+
+def normalize_query(query):
+    """Collapse case, punctuation and whitespace so trivially different queries share an entry"""
+    query = re.sub(r'[^\w\s]', ' ', query.lower())
+    return ' '.join(query.split())
+
+class SearchResultCache:
+    """
+    Bounded LRU cache of search results with per-entry TTL.
+    Entries past their TTL but within stale_ttl are still served while
+    a background task refreshes them.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300, stale_ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # key -> (results, fresh_until, stale_until)
+        self._entries = OrderedDict()
+        self._refreshing = {}
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        }
+
+    def make_key(self, query, num_results):
+        return (normalize_query(query), num_results)
+
+    async def get_or_fetch(self, query, num_results, fetch):
+        """Return cached results for the query, calling fetch() on a miss"""
+        key = self.make_key(query, num_results)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            results, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.stats['hits'] += 1
+                self._entries.move_to_end(key)
+                return results
+            if now < stale_until:
+                self.stats['stale_hits'] += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch)
+                return results
+            del self._entries[key]
+
+        self.stats['misses'] += 1
+        results = await fetch()
+        self._store(key, results)
+        return results
+
+    def _store(self, key, results):
+        # Empty results usually mean an upstream error; don't pin them
+        if not results:
+            return
+        now = time.monotonic()
+        self._entries[key] = (results, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _schedule_refresh(self, key, fetch):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self._store(key, await fetch())
+                self.stats['refreshes'] += 1
+            except Exception as e:
+                self.stats['refresh_errors'] += 1
+                print(f"Search cache refresh error: {str(e)}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+    def get_stats(self):
+        """Counters plus current size and hit rate"""
+        lookups = self.stats['hits'] + self.stats['stale_hits'] + self.stats['misses']
+        hits = self.stats['hits'] + self.stats['stale_hits']
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,46 @@
+# core/utils/serialization.py
+import json
+from datetime import datetime, date
+
+try:
+    import orjson
+except ImportError:  # plain json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack frames unavailable
+    msgpack = None
+
+def _default(obj):
+    """Encode the non-JSON types that show up in responses"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):
+        # numpy arrays and scalars
+        return obj.tolist()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+def dumps_json(obj):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(obj, default=_default).encode('utf-8')
+
+def dumps_msgpack(obj):
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+def available_formats():
+    return ['json', 'msgpack'] if msgpack is not None else ['json']
+
+def encode_frame(obj, frame_format='json'):
+    """Encode a WebSocket frame: bytes for msgpack, text for JSON"""
+    if frame_format == 'msgpack' and msgpack is not None:
+        return dumps_msgpack(obj)
+    return dumps_json(obj).decode('utf-8')
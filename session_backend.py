@@ -0,0 +1,153 @@
+# core/nlp/session_backend.py
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import msgpack
+except ImportError:  # fall back to JSON session blobs
+    msgpack = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis backend unavailable
+    aioredis = None
+
+# First byte of an encoded session blob
+FORMAT_JSON = b'j'
+FORMAT_MSGPACK = b'm'
+
+def encode_state(state):
+    """Serialize a session state dict to a compact compressed blob"""
+    if msgpack is not None:
+        return FORMAT_MSGPACK + zlib.compress(msgpack.packb(state, use_bin_type=True), 3)
+    return FORMAT_JSON + zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'), 3)
+
+def decode_state(blob):
+    body = zlib.decompress(blob[1:])
+    if blob[:1] == FORMAT_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+class SQLiteSessionBackend:
+    """
+    Session blobs in a SQLite file, shared by all workers on one host.
+    Queries run on a single dedicated thread with one connection.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='data/sessions.db', ttl=1800):
+        self.path = path
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-sqlite")
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL lets readers in other workers proceed while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, state BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+        return self._conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _load(self, session_id):
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE id = ? AND expires >= ?", (session_id, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _save(self, session_id, blob):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (id, state, expires) VALUES (?, ?, ?)",
+            (session_id, blob, time.time() + self.ttl)
+        )
+
+    def _delete(self, session_id):
+        self._connection().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _sweep(self):
+        return self._connection().execute(
+            "DELETE FROM sessions WHERE expires < ?", (time.time(),)
+        ).rowcount
+
+    async def load(self, session_id):
+        return await self._run(self._load, session_id)
+
+    async def save(self, session_id, blob):
+        await self._run(self._save, session_id, blob)
+
+    async def delete(self, session_id):
+        await self._run(self._delete, session_id)
+
+    async def sweep(self):
+        return await self._run(self._sweep)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+class RedisSessionBackend:
+    """Session blobs in Redis with a server-side TTL, shared by all workers and hosts"""
+
+    name = 'redis'
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=1800, prefix='session:'):
+        if aioredis is None:
+            raise ImportError("The redis package is required for the Redis session backend")
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = None
+
+    @property
+    def client(self):
+        # Created on first use so the connection pool belongs to the worker's loop
+        if self._client is None:
+            self._client = aioredis.from_url(self.url)
+        return self._client
+
+    async def load(self, session_id):
+        return await self.client.get(self.prefix + session_id)
+
+    async def save(self, session_id, blob):
+        await self.client.set(self.prefix + session_id, blob, ex=self.ttl)
+
+    async def delete(self, session_id):
+        await self.client.delete(self.prefix + session_id)
+
+    async def sweep(self):
+        # Expiry is handled by Redis
+        return 0
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+def create_session_backend(kind, url=None, ttl=1800):
+    """
+    Build a backend from configuration: 'sqlite' (url = file path) or 'redis'.
+    'memory' returns None, i.e. sessions stay as live objects in this process.
+    """
+    if kind == 'memory':
+        return None
+    if kind == 'sqlite':
+        return SQLiteSessionBackend(path=url or 'data/sessions.db', ttl=ttl)
+    if kind == 'redis':
+        return RedisSessionBackend(url=url or 'redis://localhost:6379/0', ttl=ttl)
+    raise ValueError(f"Unknown session backend: {kind}")
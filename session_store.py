@@ -0,0 +1,137 @@
+# core/nlp/session_store.py
+import asyncio
+import time
+from collections import OrderedDict
+from .context_manager import ContextManager
+from .session_backend import encode_state, decode_state
+
+class SessionContextStore:
+    """
+    Session-keyed ContextManager store.
+    Without a backend, sessions are live objects in this process, kept in
+    least-recently-used order so idle expiry and the global memory cap both
+    evict from the front in O(1) per session. With a backend (see
+    session_backend) each request loads the session once and saves it once,
+    so every worker sees the same context; concurrent requests in one
+    session are last-write-wins.
+    """
+
+    def __init__(self, idle_ttl=1800, max_bytes=256 * 1024 * 1024, sweep_interval=60,
+                 backend=None, **context_options):
+        self.backend = backend
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.context_options = context_options
+        self._sessions = OrderedDict()
+        self.total_bytes = 0
+        self._sweeper = None
+        self.stats = {'created': 0, 'expired': 0, 'evicted': 0}
+
+    def get(self, session_id, create=True):
+        """Return the session's ContextManager, optionally creating it"""
+        context = self._sessions.get(session_id)
+        if context is None:
+            if not create:
+                return None
+            context = ContextManager(**self.context_options)
+            self._sessions[session_id] = context
+            self.total_bytes += context.size
+            self.stats['created'] += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        context.last_access = time.monotonic()
+        return context
+
+    async def load(self, session_id, create=True):
+        """
+        Fetch a session's ContextManager (one backend read). Pass it on to
+        update_context so the request does not read it again.
+        """
+        if self.backend is None:
+            return self.get(session_id, create)
+        blob = await self.backend.load(session_id)
+        if blob is None:
+            if not create:
+                return None
+            self.stats['created'] += 1
+            return ContextManager(**self.context_options)
+        return ContextManager.from_state(decode_state(blob), **self.context_options)
+
+    async def update_context(self, session_id, user_input, ai_response, nlp_analysis, context=None):
+        """Update one session's context, then save it or enforce the memory cap"""
+        if self.backend is not None:
+            if context is None:
+                context = await self.load(session_id)
+            current = await context.update_context(user_input, ai_response, nlp_analysis)
+            await self.backend.save(session_id, encode_state(context.to_state()))
+            return current
+
+        context = self.get(session_id)
+        size_before = context.size
+        current = await context.update_context(user_input, ai_response, nlp_analysis)
+        self.total_bytes += context.size - size_before
+        self._enforce_memory_limit()
+        return current
+
+    async def remove(self, session_id):
+        if self.backend is not None:
+            await self.backend.delete(session_id)
+        context = self._sessions.pop(session_id, None)
+        if context is not None:
+            self.total_bytes -= context.size
+        return context
+
+    def _enforce_memory_limit(self):
+        # Always keep the session that was just updated
+        while self.total_bytes > self.max_bytes and len(self._sessions) > 1:
+            _, context = self._sessions.popitem(last=False)
+            self.total_bytes -= context.size
+            self.stats['evicted'] += 1
+
+    def sweep(self):
+        """Drop sessions idle for longer than idle_ttl"""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = 0
+        while self._sessions:
+            session_id, context = next(iter(self._sessions.items()))
+            if context.last_access > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.total_bytes -= context.size
+            expired += 1
+        self.stats['expired'] += expired
+        return expired
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+                if self.backend is not None:
+                    self.stats['expired'] += await self.backend.sweep()
+            except Exception as e:
+                print(f"Session sweep error: {str(e)}")
+
+    def start(self):
+        """Start the background idle-expiry sweeper"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self.backend is not None:
+            await self.backend.close()
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'backend': self.backend.name if self.backend is not None else 'memory',
+            'sessions': len(self._sessions),
+            'bytes': self.total_bytes
+        }
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,51 @@
+# core/utils/single_flight.py
+import asyncio
+import json
+from core.monitoring import metrics
+
+def request_key(text, options=None):
+    """Coalescing key: case/whitespace-normalized text plus canonical options"""
+    normalized = ' '.join(text.lower().split())
+    return normalized, json.dumps(options or {}, sort_keys=True, default=str)
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the
+    same key wait on that call and get its result. The shared call is
+    shielded from any single waiter being cancelled and is only cancelled
+    once every waiter has gone away.
+    """
+
+    def __init__(self, name=None):
+        self.name = name or 'single_flight'
+        self._calls = {}
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    async def do(self, key, func):
+        """Await func() for key, joining an in-flight call if there is one"""
+        call = self._calls.get(key)
+        if call is None:
+            call = {'task': asyncio.ensure_future(func()), 'waiters': 0}
+            self._calls[key] = call
+            call['task'].add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.stats['calls'] += 1
+        else:
+            self.stats['coalesced'] += 1
+            metrics.COALESCED_REQUESTS.inc(group=self.name)
+
+        call['waiters'] += 1
+        try:
+            return await asyncio.shield(call['task'])
+        finally:
+            call['waiters'] -= 1
+            if call['waiters'] == 0 and not call['task'].done():
+                # Nobody is waiting any more; later callers start afresh
+                self._forget(key, call)
+                call['task'].cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def get_stats(self):
+        return {**self.stats, 'in_flight': len(self._calls)}
@@ -0,0 +1,86 @@
+# core/api_integration/stage_executor.py
+import asyncio
+import time
+from core.monitoring import metrics
+
+
+class Stage:
+    """A single step of a request pipeline"""
+
+    def __init__(self, name, func, depends_on=(), timeout=None, fallback=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class StageGraph:
+    """
+    Runs stages as soon as their dependencies are done.
+    Independent stages run concurrently; each one is bounded by its own
+    timeout and by the overall deadline, and degrades to its fallback
+    value instead of failing the whole request.
+    """
+
+    def __init__(self, stages, deadline=None):
+        self.stages = []
+        self.deadline = deadline
+        seen = set()
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in seen:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown or later stage '{dep}'")
+            if stage.name in seen:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            seen.add(stage.name)
+            self.stages.append(stage)
+
+    async def run(self):
+        """Execute the graph, returning (results, report)"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = {}
+        report = {}
+
+        async def run_stage(stage):
+            dep_values = [await tasks[dep] for dep in stage.depends_on]
+            stage_start = time.perf_counter()
+            timeout = stage.timeout
+            if self.deadline is not None:
+                remaining = self.deadline - (loop.time() - started)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            status = 'ok'
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError()
+                value = await asyncio.wait_for(stage.func(*dep_values), timeout)
+            except asyncio.TimeoutError:
+                status = 'timeout'
+                value = stage.fallback
+            except Exception as e:
+                print(f"Stage '{stage.name}' error: {str(e)}")
+                status = 'error'
+                value = stage.fallback
+
+            duration = time.perf_counter() - stage_start
+            metrics.observe(stage.name, duration)
+            metrics.STAGE_OUTCOMES.inc(stage=stage.name, status=status)
+            report[stage.name] = {
+                'status': status,
+                'duration_ms': round(duration * 1000, 2)
+            }
+            return value
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            values = await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        return dict(zip(tasks.keys(), values)), report
@@ -0,0 +1,84 @@
+# core/api_integration/stage_planner.py
+from core.monitoring import metrics
+from core.utils.projection import ANALYSIS_TASKS
+from core.nlp.language_processor import DOC_TASKS
+
+# Latency estimates (ms) used for stages that have not been observed yet
+DEFAULT_ESTIMATES_MS = {
+    'search': 400,
+    'database_context': 50,
+    'llm': 2500,
+    'sentiment': 100,
+    'entities': 100,
+    'continuation': 1500,
+    'nlp.parse': 30,
+    'nlp.syntax': 5,
+    'nlp.semantics': 50,
+    'nlp.sentiment': 20,
+    'nlp.entities': 5,
+    'nlp.summary': 1500
+}
+
+# Orchestrator stages that can be left out without breaking the pipeline
+OPTIONAL_STAGES = ('sentiment', 'entities', 'continuation')
+
+class StagePlanner:
+    """
+    Decides which optional stages fit a request's latency budget, using the
+    live per-stage latency estimates and the input length.
+    search, database_context and llm always run.
+    """
+
+    def __init__(self, estimates=None, defaults=None, summary_min_words=20):
+        self.estimates = estimates or metrics.latency_estimates
+        self.defaults = {**DEFAULT_ESTIMATES_MS, **(defaults or {})}
+        self.summary_min_words = summary_min_words
+
+    def estimate(self, stage):
+        """Expected latency of a stage in ms"""
+        seconds = self.estimates.get(stage)
+        if seconds is None:
+            return self.defaults.get(stage, 0)
+        return seconds * 1000
+
+    def plan(self, text, budget_ms=None, nlp_tasks=None):
+        """
+        Returns {'budget_ms', 'estimated_ms', 'nlp_tasks', 'skipped'} where
+        skipped maps stage name (NLP tasks as 'nlp.<task>') to the reason.
+        Without a budget every requested stage runs.
+        """
+        nlp_tasks = list(ANALYSIS_TASKS if nlp_tasks is None else nlp_tasks)
+        skipped = {}
+        if budget_ms is None:
+            return {'budget_ms': None, 'estimated_ms': None, 'nlp_tasks': nlp_tasks, 'skipped': skipped}
+
+        if 'summary' in nlp_tasks and len(text.split()) < self.summary_min_words:
+            skipped['nlp.summary'] = 'short_input'
+
+        critical = max(self.estimate('search'), self.estimate('database_context')) + self.estimate('llm')
+        # The continuation runs after the LLM, so it lengthens the critical path
+        if critical + self.estimate('continuation') > budget_ms:
+            skipped['continuation'] = 'over_budget'
+        else:
+            critical += self.estimate('continuation')
+
+        # Everything else runs alongside the critical path
+        for stage in ('sentiment', 'entities'):
+            if self.estimate(stage) > budget_ms:
+                skipped[stage] = 'over_budget'
+        for task in nlp_tasks:
+            name = f"nlp.{task}"
+            if name in skipped:
+                continue
+            cost = self.estimate(name)
+            if task in DOC_TASKS:
+                cost += self.estimate('nlp.parse')
+            if cost > budget_ms:
+                skipped[name] = 'over_budget'
+
+        return {
+            'budget_ms': budget_ms,
+            'estimated_ms': round(critical, 1),
+            'nlp_tasks': [task for task in nlp_tasks if f"nlp.{task}" not in skipped],
+            'skipped': skipped
+        }
@@ -0,0 +1,63 @@
+# core/nlp/summarizer.py
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from core.models.model_registry import registry
+from core.utils.batching import MicroBatcher
+
+# Decoding settings, from best quality to lowest latency
+DECODING_PROFILES = {
+    'quality': {'num_beams': 4, 'length_penalty': 2.0, 'early_stopping': True},
+    'balanced': {'num_beams': 2, 'length_penalty': 1.0, 'early_stopping': True},
+    'greedy': {'num_beams': 1, 'do_sample': False}
+}
+
+class T5Summarizer:
+    """
+    T5 summarization off the event loop.
+    Concurrent requests are batched into a single generate() call on a
+    dedicated worker pool; inputs shorter than min_words are returned as-is.
+    """
+
+    def __init__(self, profile='quality', min_words=20, max_length=150, min_length=40,
+                 max_batch_size=8, max_wait_ms=20, workers=1):
+        if profile not in DECODING_PROFILES:
+            raise ValueError(f"Unknown decoding profile: {profile}")
+        self.profile = profile
+        self.min_words = min_words
+        self.max_length = max_length
+        self.min_length = min_length
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="t5-summarizer")
+        self.batcher = MicroBatcher(
+            self._summarize_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            executor=self.executor,
+            concurrency=workers,
+            name="t5"
+        )
+
+    async def summarize(self, text):
+        """Summarize text, skipping inputs too short to be worth it"""
+        if len(text.split()) < self.min_words:
+            return text
+        return await self.batcher.submit(text)
+
+    def _summarize_batch(self, texts):
+        tokenizer, model = registry.get('t5-base')
+        inputs = tokenizer(
+            ["summarize: " + text for text in texts],
+            return_tensors="pt",
+            max_length=512,
+            truncation=True,
+            padding=True
+        )
+
+        with torch.inference_mode():
+            summary_ids = model.generate(
+                **inputs,
+                max_length=self.max_length,
+                min_length=self.min_length,
+                **DECODING_PROFILES[self.profile]
+            )
+
+        return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
@@ -0,0 +1,189 @@
+# core/database/vector_index.py
+import json
+import os
+import tempfile
+import numpy as np
+
+class VectorIndex:
+    """
+    In-process cosine-similarity index over stored documents.
+    Vectors are kept L2-normalized in one contiguous float32 matrix that
+    grows by doubling. Search is brute force until the index has
+    train_threshold rows and nlist > 0, after which an IVF layer (k-means
+    centroids) restricts each query to the nprobe closest lists.
+    With max_size set, a full index overwrites its oldest rows.
+    """
+
+    def __init__(self, nlist=0, nprobe=4, train_threshold=4096, capacity=1024, max_size=None):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.max_size = max_size
+        self._capacity = min(capacity, max_size) if max_size else capacity
+        self._vectors = None
+        self._assignments = None
+        self._centroids = None
+        self._size = 0
+        # Next row to overwrite once the index is at max_size
+        self._oldest = 0
+        self.documents = []
+        self.dropped = {'empty': 0, 'dimension': 0}
+        # Caller state saved alongside the index (JSON-serializable)
+        self.state = {}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dim(self):
+        return self._vectors.shape[1] if self._vectors is not None else None
+
+    def add(self, vector, document):
+        """Add one document; its vector is copied into the matrix"""
+        vector = self._normalize(vector)
+        if vector is None:
+            self._drop('empty', "zero or missing vector")
+            return False
+        if self._vectors is None:
+            self._vectors = np.zeros((self._capacity, vector.shape[0]), dtype=np.float32)
+            self._assignments = np.zeros(self._capacity, dtype=np.int32)
+        elif vector.shape[0] != self.dim:
+            self._drop('dimension', f"vector has {vector.shape[0]} dimensions, index has {self.dim}")
+            return False
+
+        if self.max_size and self._size >= self.max_size:
+            row = self._oldest
+            self._oldest = (self._oldest + 1) % self.max_size
+            self.documents[row] = document
+        else:
+            if self._size == self._vectors.shape[0]:
+                self._grow()
+            row = self._size
+            self.documents.append(document)
+            self._size += 1
+
+        self._vectors[row] = vector
+        if self._centroids is not None:
+            self._assignments[row] = int(np.argmax(self._centroids @ vector))
+
+        if self.nlist and self._centroids is None and self._size >= self.train_threshold:
+            self.train()
+        return True
+
+    def search(self, vector, k=5):
+        """Return the top-k documents with their similarity scores"""
+        vector = self._normalize(vector)
+        if vector is None or self._size == 0 or vector.shape[0] != self.dim:
+            return []
+
+        vectors = self._vectors[:self._size]
+        if self._centroids is not None:
+            probes = np.argsort(self._centroids @ vector)[-self.nprobe:]
+            rows = np.flatnonzero(np.isin(self._assignments[:self._size], probes))
+            similarities = vectors[rows] @ vector
+        else:
+            rows = None
+            similarities = vectors @ vector
+
+        k = min(k, similarities.shape[0])
+        if k == 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        positions = rows[top] if rows is not None else top
+        return [
+            {**self.documents[position], 'score': float(similarities[i])}
+            for i, position in zip(top, positions)
+        ]
+
+    def train(self, iterations=10, seed=0):
+        """Fit IVF centroids with spherical k-means over the current vectors"""
+        vectors = self._vectors[:self._size]
+        nlist = min(self.nlist, self._size)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(self._size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = vectors[assignments == cluster]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        self._centroids = centroids
+        self._assignments[:self._size] = np.argmax(vectors @ centroids.T, axis=1)
+
+    def save(self, path):
+        """Write the index and self.state to a single .npz file atomically"""
+        if self._vectors is None:
+            return
+        # Unique temp file in the target directory, so concurrent savers never share it
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:self._size],
+                    assignments=self._assignments[:self._size],
+                    centroids=self._centroids if self._centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+                    documents=_json_bytes(self.documents),
+                    state=_json_bytes(self.state),
+                    config=np.array([self.nlist, self.nprobe, self.train_threshold,
+                                     self.max_size or 0, self._oldest])
+                )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            config = [int(value) for value in data['config']]
+            nlist, nprobe, train_threshold = config[:3]
+            max_size, oldest = config[3:5] if len(config) >= 5 else (0, 0)
+            index = cls(nlist=nlist, nprobe=nprobe, train_threshold=train_threshold,
+                        capacity=max(1024, len(data['vectors'])), max_size=max_size or None)
+            index._oldest = oldest
+            size = len(data['vectors'])
+            if size:
+                index._vectors = np.zeros((index._capacity, data['vectors'].shape[1]), dtype=np.float32)
+                index._assignments = np.zeros(index._capacity, dtype=np.int32)
+                index._vectors[:size] = data['vectors']
+                index._assignments[:size] = data['assignments']
+                if len(data['centroids']):
+                    index._centroids = data['centroids']
+            index._size = size
+            index.documents = json.loads(data['documents'].tobytes().decode('utf-8'))
+            if 'state' in data.files:
+                index.state = json.loads(data['state'].tobytes().decode('utf-8'))
+        return index
+
+    def _drop(self, reason, detail):
+        self.dropped[reason] += 1
+        count = self.dropped[reason]
+        # Log the first drop and then every 1000th, not every request
+        if count == 1 or count % 1000 == 0:
+            print(f"Vector index: dropped {count} vector(s) ({detail})")
+
+    def _grow(self):
+        capacity = self._vectors.shape[0] * 2
+        if self.max_size:
+            capacity = min(capacity, self.max_size)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._assignments = vectors, assignments
+
+    @staticmethod
+    def _normalize(vector):
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+def _json_bytes(value):
+    return np.frombuffer(json.dumps(value, default=str).encode('utf-8'), dtype=np.uint8)
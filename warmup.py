@@ -0,0 +1,57 @@
+# core/runtime/warmup.py
+import threading
+import time
+
+WARMUP_TEXT = "Warmup request: how does the weather in Paris affect tourism in summer?"
+
+class Readiness:
+    """Tracks whether this process has finished warming up and may take traffic"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.details = {}
+
+    @property
+    def ready(self):
+        return self._event.is_set()
+
+    def mark_ready(self, details=None):
+        self.details = details or {}
+        self._event.set()
+
+    def mark_unready(self):
+        self._event.clear()
+
+def models_loaded(timings):
+    """True when every model in a run_warmup() result loaded"""
+    return all(duration is not None for duration in timings['models'].values())
+
+def run_warmup(model_registry, models, language_processor, orchestrator):
+    """
+    Load `models` and push one request through every model path so lazy
+    initialisation (weights, tokenizers, kernels) happens before serving.
+    Blocking. Runs inference, so call it in the serving process: torch and
+    CUDA state created before a fork is not usable in the children.
+    """
+    timings = {'models': model_registry.warmup(models)}
+    steps = {
+        'spacy': lambda: language_processor._parse_batch([WARMUP_TEXT]),
+        'embedding': lambda: language_processor.embed_text(WARMUP_TEXT),
+        't5': lambda: language_processor.summarizer._summarize_batch([WARMUP_TEXT]),
+        'hf.classify': lambda: orchestrator.huggingface._classify_batch([WARMUP_TEXT]),
+        'hf.ner': lambda: orchestrator.huggingface._ner_batch([WARMUP_TEXT]),
+        'hf.generate': lambda: orchestrator.huggingface._generate_batch([WARMUP_TEXT])
+    }
+    inference = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+            inference[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            print(f"Warmup inference error ({name}): {str(e)}")
+            inference[name] = None
+    timings['inference'] = inference
+    return timings
+
+readiness = Readiness()
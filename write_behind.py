@@ -0,0 +1,114 @@
+# core/database/write_behind.py
+import asyncio
+import numpy as np
+from bson.errors import InvalidDocument
+
+def bson_safe(value):
+    """Copy of value with numpy values, tuples and sets converted to types BSON can encode"""
+    if isinstance(value, dict):
+        return {str(key): bson_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [bson_safe(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class WriteBehindQueue:
+    """
+    Bounded write-behind buffer for a collection.
+    Documents are queued on the request path and written in the background
+    with insert_many, once batch_size documents are waiting or
+    flush_interval seconds have passed. A full queue makes put() wait,
+    pushing back on producers instead of growing without bound.
+    Documents are converted to BSON-safe types when queued; if a batch
+    still cannot be encoded, its documents are retried one at a time so
+    one bad document does not drop the rest.
+    """
+
+    def __init__(self, collection, max_queue=10000, batch_size=100, flush_interval=0.5):
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._worker = None
+        self._closing = False
+        self.stats = {'enqueued': 0, 'written': 0, 'failed': 0, 'flushes': 0, 'blocked': 0, 'retried': 0}
+
+    async def put(self, document):
+        """Queue a document for writing, waiting while the queue is full"""
+        if self._closing:
+            raise RuntimeError("Write-behind queue is closed")
+        self._ensure_worker()
+        document = bson_safe(document)
+        if self._queue.full():
+            self.stats['blocked'] += 1
+        await self._queue.put(document)
+        self.stats['enqueued'] += 1
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.stats['written'] += len(batch)
+        except InvalidDocument as e:
+            print(f"Write-behind flush error, retrying documents one by one: {str(e)}")
+            await self._flush_each(batch)
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            print(f"Write-behind flush error: {str(e)}")
+        finally:
+            self.stats['flushes'] += 1
+
+    async def _flush_each(self, batch):
+        # Documents already sent carry their _id, so a retry cannot duplicate them
+        for document in batch:
+            self.stats['retried'] += 1
+            try:
+                await self.collection.insert_one(document)
+                self.stats['written'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"Write-behind insert error: {str(e)}")
+
+    async def drain(self):
+        """Stop accepting documents and flush everything still queued"""
+        self._closing = True
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def get_stats(self):
+        return {**self.stats, 'depth': self.depth, 'max_queue': self.max_queue}